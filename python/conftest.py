@@ -0,0 +1,81 @@
+"""
+Shared pytest fixtures
+
+Join graphs for the common topologies are built once per test module and
+shared by every test that only reads them. Tests that add joins or rebuild
+equivalence classes still construct their own JoinGraph.
+"""
+
+from typing import Callable, Dict
+
+import pytest
+
+from join_graph import JoinGraph
+
+
+# Join column of the i-th chain table: a.x = b.y, b.y = c.z, c.z = d.w, ...
+CHAIN_COLUMNS = 'xyzwvutsrq'
+
+
+def _build_chain(n: int) -> JoinGraph:
+    """
+    Build chain a - b - c - ... of n tables, closed and with ECs built
+    
+    Consecutive tables join on their own columns, so all join columns land
+    in one equivalence class and the closure links every pair.
+    
+    Args:
+        n: Number of tables (at most len(CHAIN_COLUMNS))
+    
+    Returns:
+        JoinGraph over tables 'a', 'b', ...
+    """
+    jg = JoinGraph()
+    tables = [chr(ord('a') + i) for i in range(n)]
+    for i in range(n - 1):
+        jg.add_join(tables[i], tables[i + 1], CHAIN_COLUMNS[i], CHAIN_COLUMNS[i + 1], is_original=True)
+    jg.compute_transitive_closure()
+    jg.build_equivalence_classes()
+    return jg
+
+
+def _build_star(n: int) -> JoinGraph:
+    """
+    Build star with center.id = s<i>.cid for s1..sn, closed and with ECs built
+    
+    Args:
+        n: Number of satellite tables
+    
+    Returns:
+        JoinGraph over tables 'center', 's1', ..., 's<n>'
+    """
+    jg = JoinGraph()
+    for i in range(1, n + 1):
+        jg.add_join('center', f's{i}', 'id', 'cid', is_original=True)
+    jg.compute_transitive_closure()
+    jg.build_equivalence_classes()
+    return jg
+
+
+def _graph_factory(build: Callable[[int], JoinGraph]) -> Callable[[int], JoinGraph]:
+    """Wrap a graph builder so each size is built once"""
+    graphs: Dict[int, JoinGraph] = {}
+    
+    def get(n: int) -> JoinGraph:
+        if n not in graphs:
+            graphs[n] = build(n)
+        return graphs[n]
+    
+    return get
+
+
+@pytest.fixture(scope='module')
+def chain_graph() -> Callable[[int], JoinGraph]:
+    """Factory: chain_graph(n) -> shared, read-only chain JoinGraph"""
+    return _graph_factory(_build_chain)
+
+
+@pytest.fixture(scope='module')
+def star_graph() -> Callable[[int], JoinGraph]:
+    """Factory: star_graph(n) -> shared, read-only star JoinGraph"""
+    return _graph_factory(_build_star)
@@ -6,10 +6,10 @@ the join enumerator implementation.
 """
 
 from dataclasses import dataclass
-from typing import Set, List, Optional, Dict
+from typing import List, Optional, Dict, Tuple, FrozenSet, NamedTuple, Sequence
 
 
-@dataclass
+@dataclass(slots=True)
 class JoinDetail:
     """
     Join between two tables with column information
@@ -28,7 +28,7 @@ class JoinDetail:
     is_original: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class TransitiveJoin:
     """
     Transitive join candidate formed from two existing joins
@@ -41,7 +41,7 @@ class TransitiveJoin:
     t2_col: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ConstantValue:
     """
     Single constant value extracted from a predicate
@@ -53,7 +53,7 @@ class ConstantValue:
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ConstantEqualityJoin:
     """
     Join inferred from constant equality
@@ -65,11 +65,12 @@ class ConstantEqualityJoin:
     column: str
 
 
-@dataclass
-class JoinCondition:
+class JoinCondition(NamedTuple):
     """
     Parsed join condition from SQL
     
+    A named tuple: only built and consumed during parsing.
+    
     Example: "A.x = B.y" => JoinCondition('A', 'x', 'B', 'y')
     """
     left_table: str
@@ -78,7 +79,7 @@ class JoinCondition:
     right_column: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PredicateSet:
     """
     Classified predicates for a subset of tables
@@ -88,23 +89,23 @@ class PredicateSet:
         joins: Two-table predicates (e.g., "t1.x = t2.y")
         complex: Multi-table predicates (e.g., "t1.x = t2.y + t3.z")
     """
-    selections: List[str]
-    joins: List[str]
-    complex: List[str]
+    selections: Tuple[str, ...]
+    joins: Tuple[str, ...]
+    complex: Tuple[str, ...]
 
 
-@dataclass
+@dataclass(slots=True)
 class Decomposition:
     """
     Valid decomposition of a subset into left ⋈ right
     
-    Example: {A, B, C} => Decomposition({A, B}, {C})
+    Example: {A, B, C} => Decomposition(('A', 'B'), ('C',))
     """
-    left: Set[str]
-    right: Set[str]
+    left: Tuple[str, ...]
+    right: Tuple[str, ...]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class JoinPredicate:
     """
     Join predicate with priority flag
@@ -117,35 +118,111 @@ class JoinPredicate:
     is_original: bool
 
 
-@dataclass
-class NextTable:
+class NextTable(NamedTuple):
     """
     Next table to add to JOIN tree with its join predicate
     
-    Used during SQL generation to build JOIN tree by following edges
+    Used during SQL generation to build JOIN tree by following edges.
+    A named tuple, so callers can unpack it as (table, join_pred).
     """
     table: str
     join_pred: Optional[JoinPredicate]
 
 
-@dataclass
+class BitmaskSubset:
+    """
+    Subset of tables stored as a bitmask over a sorted table list
+    
+    Behaves like the sorted tuple of table aliases it stands for (len, iter,
+    indexing, membership), but the tuple is only built on first use, so
+    subsets that are never read cost no more than their bitmask.
+    
+    Compares and hashes by its alias tuple: equal to a BitmaskSubset or
+    tuple of the same sorted aliases.
+    
+    Attributes:
+        mask: Subset bitmask; bit i <=> tables[i]
+    """
+    __slots__ = ('mask', '_tables', '_table_bits', '_names')
+    
+    def __init__(self, mask: int, tables: List[str], table_bits: Dict[str, int]):
+        """
+        Args:
+            mask: Subset bitmask
+            tables: Sorted tables; bit i <=> tables[i] (shared, not copied)
+            table_bits: table -> 1 << index (shared, not copied)
+        """
+        self.mask = mask
+        self._tables = tables
+        self._table_bits = table_bits
+        self._names: Optional[Tuple[str, ...]] = None
+    
+    @property
+    def names(self) -> Tuple[str, ...]:
+        """Table aliases whose bits are set, in sorted order"""
+        names = self._names
+        if names is None:
+            tables = self._tables
+            collected = []
+            mask = self.mask
+            while mask:
+                low = mask & -mask
+                collected.append(tables[low.bit_length() - 1])
+                mask ^= low
+            names = self._names = tuple(collected)
+        return names
+    
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+    
+    def __iter__(self):
+        return iter(self.names)
+    
+    def __getitem__(self, index):
+        return self.names[index]
+    
+    def __contains__(self, name: str) -> bool:
+        return bool(self.mask & self._table_bits.get(name, 0))
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, BitmaskSubset):
+            if other._tables is self._tables:
+                # Same table list: equal masks <=> equal alias tuples
+                return self.mask == other.mask
+            return self.names == other.names
+        if isinstance(other, tuple):
+            return self.names == other
+        return NotImplemented
+    
+    def __hash__(self) -> int:
+        # Hash as the alias tuple, the key equality compares
+        return hash(self.names)
+    
+    def __repr__(self) -> str:
+        return repr(self.names)
+
+
+@dataclass(slots=True)
 class EnumerationPlan:
     """
     Single enumerated subset with metadata
     
+    Subsets are never mutated and are always consumed in sorted order. The
+    enumerator emits BitmaskSubsets; plain sorted tuples work as well.
+    
     Attributes:
-        subset: Set of table aliases
+        subset: Sorted table aliases
         left: Left subset in decomposition (None for base tables)
         right: Right subset in decomposition (None for base tables)
         sql: Generated SQL query for this subset
     """
-    subset: Set[str]
-    left: Optional[Set[str]]
-    right: Optional[Set[str]]
+    subset: Sequence[str]
+    left: Optional[Sequence[str]]
+    right: Optional[Sequence[str]]
     sql: str
 
 
-@dataclass
+@dataclass(slots=True)
 class EnumerationResult:
     """
     Complete enumeration results for a query
@@ -158,13 +235,17 @@ class EnumerationResult:
     counts: Dict[int, int]
 
 
-@dataclass
+@dataclass(slots=True)
 class ParsedSQL:
     """
     Result of SQL parsing
     
     Contains all information extracted from a SQL query needed for enumeration
     
+    parse_sql caches its results, so one instance (with its join_graph and
+    classifier) is shared by every caller parsing the same SQL. Treat it as
+    read-only: adding joins or predicates would change later parses too.
+    
     Attributes:
         tables: List of table aliases in query
         aliases: Mapping from alias to base table name
@@ -180,4 +261,4 @@ class ParsedSQL:
 # Type aliases for clarity
 TableAlias = str
 CanonicalKey = str  # Sorted, pipe-separated table names: "t1|||t2|||t3"
-EdgeKey = str  # Sorted pair: "t1|||t2"
+EdgeKey = FrozenSet[str]  # Unordered pair: frozenset({t1, t2})
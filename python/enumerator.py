@@ -5,10 +5,9 @@ Dynamic Programming-based join enumeration that matches PostgreSQL's behavior.
 Enumerates all connected subsets in level-by-level order.
 """
 
-from typing import Set, List, Optional, Dict
-from itertools import combinations
+from typing import Set, List, Optional, Dict, Tuple
 
-from constants import EnumerationResult, EnumerationPlan, Decomposition
+from constants import BitmaskSubset, EnumerationResult, EnumerationPlan
 from join_graph import JoinGraph
 
 
@@ -28,20 +27,140 @@ class PostgreSQLJoinEnumerator:
             join_graph: JoinGraph with all joins and equivalence classes
         """
         self.join_graph = join_graph
-        self.dp_table: Set[str] = set()  # Canonical subset keys
+        self.ec_masks: Dict[int, int] = {}  # subset bitmask -> EC bitmask; keys are the DP table
+        self.dp_by_level: List[List[int]] = [[]]  # level -> bitmasks, in enumeration order
+        self.tables: List[str] = []  # Sorted tables; bit i <=> tables[i]
+        self.table_bits: Dict[str, int] = {}  # table -> 1 << index
+        self.neighbor_bits: List[int] = []  # index -> bitmask of tables sharing an EC
+        self._mask_format = '0b'  # format spec printing a subset bitmask at full width
         self.all_plans: List[EnumerationPlan] = []  # Ordered results
         self.counts: Dict[int, int] = {}  # level -> count
     
-    def enumerate_subsets(self, tables: List[str], max_level: int = 20) -> EnumerationResult:
+    def enumerate_subsets(
+        self,
+        tables: List[str],
+        max_level: int = 20,
+        strategy: str = 'exact',
+        idp_window: int = 10
+    ) -> EnumerationResult:
         """
         Enumerate all valid join subsets using dynamic programming
         
         Args:
             tables: List of table aliases to enumerate
             max_level: Maximum enumeration level (default 20)
+            strategy: 'exact' enumerates every connected subset; 'idp' uses
+                     Iterative Dynamic Programming for wide queries
+            idp_window: Units per DP round for strategy='idp' (see enumerate_idp)
         
         Returns:
             EnumerationResult with all plans and counts
+        
+        Raises:
+            ValueError: If strategy is unknown
+        """
+        if strategy == 'idp':
+            return self.enumerate_idp(tables, k=idp_window, max_level=max_level)
+        if strategy != 'exact':
+            raise ValueError(f"Unknown enumeration strategy: {strategy}")
+        
+        max_level = self._reset(tables, max_level)
+        tables = self.tables
+        
+        # No connected subset is larger than the largest join graph component,
+        # so the levels above it are known to be empty
+        last_level = min(max_level, self._largest_component_size())
+        
+        # Enumerate level by level
+        for level in range(1, last_level + 1):
+            self.counts[level] = self._enumerate_level(level, tables)
+        
+        return EnumerationResult(
+            all_plans=self.all_plans,
+            counts=self.counts
+        )
+    
+    def enumerate_idp(self, tables: List[str], k: int = 10, max_level: int = 20) -> EnumerationResult:
+        """
+        Enumerate join subsets with Iterative Dynamic Programming
+        
+        Exhaustive enumeration grows exponentially with the number of tables,
+        which is why PostgreSQL hands queries above 12 joins to GEQO. IDP keeps
+        each DP round to a window of at most k units, where a unit is a base
+        table or a frozen subset. A window is grown greedily from the first
+        unit that joins anything, each time adding the unit with the most
+        joins into it. The DP runs over the window's units, and the window is
+        then frozen into a single unit. Rounds repeat until at most k units
+        remain, and a last round runs the DP over all of them.
+        
+        Base tables come first, as in enumerate_subsets. Every emitted subset
+        is connected and emitted once, and the left and right sides of each
+        plan were emitted before it. Plans are in level order within each
+        round. With at most k tables this is exactly enumerate_subsets.
+        
+        Args:
+            tables: List of table aliases to enumerate
+            k: Maximum number of units per DP round (at least 2)
+            max_level: Maximum number of tables per subset (default 20)
+        
+        Returns:
+            EnumerationResult with all plans and counts (keyed by table count)
+        
+        Raises:
+            ValueError: If k is less than 2
+        """
+        if k < 2:
+            raise ValueError(f"IDP window must be at least 2, got {k}")
+        
+        max_level = self._reset(tables, max_level)
+        
+        # Every base table starts as its own unit (a table bitmask)
+        units = [self.table_bits[t] for t in self.tables]
+        for unit in units:
+            self._add_subset(unit, None)
+        
+        # Freeze greedy windows until a single round can cover every unit
+        while len(units) > k:
+            window = self._idp_window(units, k, max_level)
+            if window is None:
+                break
+            
+            window_units = []
+            remaining = []
+            for i, unit in enumerate(units):
+                (window_units if window >> i & 1 else remaining).append(unit)
+            
+            self._enumerate_units(window_units, max_level)
+            
+            merged = 0
+            for unit in window_units:
+                merged |= unit
+            remaining.append(merged)
+            
+            # Keep units ordered by their smallest table
+            units = sorted(remaining, key=lambda unit: unit & -unit)
+        
+        if len(units) <= k:
+            self._enumerate_units(units, max_level)
+        
+        for level in self.counts:
+            self.counts[level] = len(self.dp_by_level[level])
+        
+        return EnumerationResult(
+            all_plans=self.all_plans,
+            counts=self.counts
+        )
+    
+    def _reset(self, tables: List[str], max_level: int) -> int:
+        """
+        Reset enumeration state for a new table list
+        
+        Args:
+            tables: List of table aliases to enumerate
+            max_level: Requested maximum enumeration level
+        
+        Returns:
+            max_level limited to the number of tables
         """
         # Sort tables for consistent ordering
         tables = sorted(tables)
@@ -51,21 +170,157 @@ class PostgreSQLJoinEnumerator:
         max_level = min(max_level, num_tables)
         
         # Reset state
-        self.dp_table = set()
+        self.ec_masks = {}
+        self.dp_by_level = [[] for _ in range(max_level + 1)]
+        self.tables = tables
+        self.table_bits = {t: 1 << i for i, t in enumerate(tables)}
+        self._mask_format = f'0{num_tables}b'
+        self.neighbor_bits = [
+            sum(self.table_bits[u] for u in tables if u != t and self.join_graph.are_in_same_ec(t, u))
+            for t in tables
+        ]
         self.all_plans = []
-        self.counts = {}
         
-        # Enumerate level by level
-        for level in range(1, max_level + 1):
-            checked, added, skipped = self._enumerate_level(level, tables)
-            self.counts[level] = added
+        # Every level gets an entry, so the dict is sized once up front
+        self.counts = dict.fromkeys(range(1, max_level + 1), 0)
         
-        return EnumerationResult(
-            all_plans=self.all_plans,
-            counts=self.counts
-        )
+        return max_level
+    
+    def _enumerate_units(self, units: List[int], max_level: int) -> None:
+        """
+        Run one IDP round: the DP over the connected subsets of units
+        
+        Unit subsets are bitmasks over unit indexes and follow the same rules
+        as table subsets in _enumerate_level. Candidates extend the previous
+        level along unit adjacency, come in combinations() order, and split
+        by peeling off one unit. Subsets already emitted earlier take part in
+        the DP but are not emitted again.
+        
+        Args:
+            units: Table bitmasks of the units, ordered by smallest table
+            max_level: Maximum number of tables per emitted subset
+        """
+        ec_masks = self.ec_masks
+        adjacency = self._unit_adjacency(units)
+        unit_format = f'0{len(units)}b'
+        
+        unit_tables: Dict[int, int] = {1 << i: unit for i, unit in enumerate(units)}  # unit subset -> table bitmask
+        previous = list(unit_tables)
+        
+        while previous:
+            # Extend connected subsets by one adjacent unit
+            candidates: Dict[int, int] = {}
+            for ubits in previous:
+                frontier = self._unit_neighbors(ubits, adjacency) & ~ubits
+                while frontier:
+                    bit = frontier & -frontier
+                    mask = unit_tables[ubits] | units[bit.bit_length() - 1]
+                    if mask.bit_count() <= max_level:
+                        candidates[ubits | bit] = mask
+                    frontier ^= bit
+            
+            previous = []
+            for ubits in sorted(candidates, key=lambda u: int(format(u, unit_format)[::-1], 2), reverse=True):
+                mask = candidates[ubits]
+                
+                # Peel off the first unit whose removal leaves an enumerated, joinable rest
+                rest = ubits
+                while rest:
+                    bit = rest & -rest
+                    left = units[bit.bit_length() - 1]
+                    right = unit_tables.get(ubits ^ bit)
+                    if right is not None and ec_masks[left] & ec_masks[right]:
+                        break
+                    rest ^= bit
+                else:
+                    continue
+                
+                unit_tables[ubits] = mask
+                previous.append(ubits)
+                if mask not in ec_masks:
+                    self._add_subset(mask, (left, right))
     
-    def _enumerate_level(self, level: int, tables: List[str]) -> tuple:
+    def _idp_window(self, units: List[int], k: int, max_level: int) -> Optional[int]:
+        """
+        Pick the next IDP window of up to k connected units
+        
+        Grows from the first unit that can grow, each time adding the
+        adjacent unit with the most joins into the window (lowest index on
+        ties) whose tables keep the window within max_level.
+        
+        Args:
+            units: Table bitmasks of the units, ordered by smallest table
+            k: Maximum number of units in the window
+            max_level: Maximum number of tables in the window
+        
+        Returns:
+            Unit subset bitmask of at least 2 units, or None if no unit can grow
+        """
+        adjacency = self._unit_adjacency(units)
+        
+        for start in range(len(units)):
+            window = 1 << start
+            window_tables = units[start]
+            
+            for _ in range(k - 1):
+                best = None
+                best_links = 0
+                frontier = self._unit_neighbors(window, adjacency) & ~window
+                while frontier:
+                    bit = frontier & -frontier
+                    frontier ^= bit
+                    i = bit.bit_length() - 1
+                    if (window_tables | units[i]).bit_count() > max_level:
+                        continue
+                    links = (adjacency[i] & window).bit_count()
+                    if links > best_links:
+                        best, best_links = i, links
+                
+                if best is None:
+                    break
+                window |= 1 << best
+                window_tables |= units[best]
+            
+            if window != 1 << start:
+                return window
+        
+        return None
+    
+    def _unit_adjacency(self, units: List[int]) -> List[int]:
+        """
+        Get, for each unit, the bitmask of units it joins with
+        
+        Args:
+            units: Table bitmasks of the units (all already in ec_masks)
+        
+        Returns:
+            unit index -> bitmask of other units sharing an EC with it
+        """
+        unit_ecs = [self.ec_masks[unit] for unit in units]
+        return [
+            sum(1 << j for j, other_ecs in enumerate(unit_ecs) if j != i and ecs & other_ecs)
+            for i, ecs in enumerate(unit_ecs)
+        ]
+    
+    def _unit_neighbors(self, ubits: int, adjacency: List[int]) -> int:
+        """
+        Get bitmask of all units joining with any unit in a unit subset
+        
+        Args:
+            ubits: Unit subset bitmask
+            adjacency: unit index -> bitmask of units it joins with
+        
+        Returns:
+            OR of the adjacency bitmasks of every unit in the subset
+        """
+        neighbors = 0
+        while ubits:
+            low = ubits & -ubits
+            neighbors |= adjacency[low.bit_length() - 1]
+            ubits ^= low
+        return neighbors
+    
+    def _enumerate_level(self, level: int, tables: List[str]) -> int:
         """
         Enumerate all subsets at a given level
         
@@ -74,109 +329,178 @@ class PostgreSQLJoinEnumerator:
             tables: Full list of tables
         
         Returns:
-            Tuple of (checked, added, skipped) counts
+            Number of subsets added
         """
-        checked = 0
-        added = 0
-        skipped = 0
+        # Generate connected k-subsets in sorted (combinations) order.
+        # Connectivity is never re-checked: candidates are connected by
+        # construction, and a valid split implies it for level >= 2.
+        candidates = self._connected_candidates(level, tables)
         
-        # Generate all k-subsets in sorted order
-        for subset_tuple in combinations(tables, level):
-            subset = set(subset_tuple)
-            checked += 1
-            
-            # Check connectivity via equivalence classes
-            if not self.join_graph.is_connected(subset):
-                skipped += 1
-                continue
-            
+        for mask in candidates:
             # For level 1, add directly
             if level == 1:
-                self._add_subset(subset, None, None)
-                added += 1
-            else:
-                # Find valid decomposition
-                decomp = self._find_valid_decomposition(subset)
-                if decomp:
-                    self._add_subset(subset, decomp.left, decomp.right)
-                    added += 1
-                else:
-                    skipped += 1
+                self._add_subset(mask, None)
+                continue
+            
+            # Every connected subset splits into one table ⋈ the rest
+            split = self._find_single_table_split(mask)
+            assert split is not None, "connected subset without a single-table split"
+            self._add_subset(mask, split)
         
-        return (checked, added, skipped)
+        return len(candidates)
     
-    def _find_valid_decomposition(self, subset: Set[str]) -> Optional[Decomposition]:
+    def _connected_candidates(self, level: int, tables: List[str]) -> List[int]:
         """
-        Find a valid decomposition of subset into left ⋈ right
+        Generate the connected subsets of a given level
         
-        A decomposition is valid if:
-        1. Both left and right are in dp_table (already enumerated)
-        2. left and right can join (share an equivalence class)
-        3. left ∪ right = subset
+        Every connected k-subset contains a connected (k-1)-subset, and every
+        connected (k-1)-subset is already in dp_by_level. Extending those by one
+        neighboring table yields exactly the connected k-subsets, without
+        testing the disconnected combinations.
         
         Args:
-            subset: Subset to decompose
+            level: Size of subsets to generate
+            tables: Full list of tables
+        
+        Returns:
+            Subset bitmasks in the same order as combinations(tables, level)
+        """
+        if level == 1:
+            return [self.table_bits[t] for t in tables]
+        
+        candidates: Set[int] = set()
+        for mask in self.dp_by_level[level - 1]:
+            frontier = self._neighbors_of(mask) & ~mask
+            while frontier:
+                bit = frontier & -frontier
+                candidates.add(mask | bit)
+                frontier ^= bit
+        
+        return sorted(candidates, key=self._combination_order, reverse=True)
+    
+    def _largest_component_size(self) -> int:
+        """
+        Get the size of the largest connected component over self.tables
+        
+        Components are flood-filled over neighbor_bits, the same adjacency
+        _connected_candidates extends subsets along.
         
         Returns:
-            Decomposition if found, None otherwise
+            Number of tables in the largest component (0 if no tables)
         """
-        subset_size = len(subset)
+        neighbor_bits = self.neighbor_bits
+        unvisited = (1 << len(self.tables)) - 1
+        largest = 0
         
-        # Try all possible split sizes
-        for left_size in range(1, subset_size):
-            right_size = subset_size - left_size
+        while unvisited:
+            # Grow a component from the lowest unvisited table
+            component = frontier = unvisited & -unvisited
+            while frontier:
+                low = frontier & -frontier
+                frontier ^= low
+                new = neighbor_bits[low.bit_length() - 1] & ~component
+                component |= new
+                frontier |= new
             
-            # Generate all left subsets of this size
-            for left_tuple in combinations(sorted(subset), left_size):
-                left = set(left_tuple)
-                right = subset - left
-                
-                # Check if both are already enumerated
-                left_key = self._canonical_key(left)
-                right_key = self._canonical_key(right)
-                
-                if left_key not in self.dp_table or right_key not in self.dp_table:
-                    continue
-                
-                # Check if they can join
-                if self.join_graph.can_join(left, right):
-                    return Decomposition(left=left, right=right)
+            unvisited &= ~component
+            largest = max(largest, component.bit_count())
         
-        return None
+        return largest
     
-    def _add_subset(self, subset: Set[str], left: Optional[Set[str]], right: Optional[Set[str]]) -> None:
+    def _neighbors_of(self, mask: int) -> int:
         """
-        Add a subset to results and dp_table
+        Get bitmask of all tables sharing an EC with any table in subset
         
         Args:
-            subset: Subset being added
-            left: Left part of decomposition (None for base tables)
-            right: Right part of decomposition (None for base tables)
+            mask: Subset bitmask
+        
+        Returns:
+            OR of the neighbor bitmasks of every table in the subset
+        """
+        neighbor_bits = self.neighbor_bits
+        neighbors = 0
+        while mask:
+            low = mask & -mask
+            neighbors |= neighbor_bits[low.bit_length() - 1]
+            mask ^= low
+        return neighbors
+    
+    def _combination_order(self, mask: int) -> int:
         """
-        # Add to dp_table
-        key = self._canonical_key(subset)
-        self.dp_table.add(key)
+        Sort key placing same-size subset bitmasks in combinations() order
         
-        # Create plan (SQL will be generated later)
-        plan = EnumerationPlan(
-            subset=subset,
-            left=left,
-            right=right,
-            sql=""  # Will be filled by SQL generator
-        )
+        For two subsets of equal size, the one holding the smallest table
+        of their symmetric difference comes first. Reversing the bit order
+        makes that table the most significant differing bit, so sorting the
+        reversed masks in descending order gives combinations() order.
         
-        self.all_plans.append(plan)
+        Args:
+            mask: Subset bitmask
+        
+        Returns:
+            The mask with its bits reversed over len(tables) positions
+        """
+        return int(format(mask, self._mask_format)[::-1], 2)
     
-    def _canonical_key(self, subset: Set[str]) -> str:
+    def _find_single_table_split(self, mask: int) -> Optional[Tuple[int, int]]:
         """
-        Generate canonical key for subset
+        Find a decomposition of subset into one table ⋈ the rest
         
-        Always uses sorted order to ensure consistency.
+        Tries the tables of the subset in sorted order. A connected subset
+        always has such a split: drop a leaf of any spanning tree, and the
+        rest is a connected subset enumerated at the previous level. This
+        takes O(level) dict lookups, as in DPccp's csg-cmp pairs.
         
         Args:
-            subset: Set of table aliases
+            mask: Bitmask of the subset to decompose
         
         Returns:
-            Canonical key string
+            (left, right) bitmasks if found, None otherwise
         """
-        return '|||'.join(sorted(subset))
+        ec_masks = self.ec_masks
+        rest = mask
+        
+        while rest:
+            bit = rest & -rest
+            right = mask ^ bit
+            right_ecs = ec_masks.get(right)
+            if right_ecs is not None and ec_masks[bit] & right_ecs:
+                return bit, right
+            rest ^= bit
+        
+        return None
+    
+    def _add_subset(self, mask: int, split: Optional[Tuple[int, int]]) -> None:
+        """
+        Add a subset to results and the DP table (ec_masks, dp_by_level)
+        
+        Subsets stay bitmasks throughout the DP; the emitted plan wraps them
+        in BitmaskSubsets, which only build table tuples when read.
+        
+        Args:
+            mask: Bitmask of the subset
+            split: (left, right) bitmasks of the decomposition (None for base tables)
+        """
+        tables = self.tables
+        table_bits = self.table_bits
+        
+        # Add to the DP table; a join touches the union of its sides' ECs
+        self.dp_by_level[mask.bit_count()].append(mask)
+        if split is None:
+            self.ec_masks[mask] = self.join_graph.ec_mask((tables[mask.bit_length() - 1],))
+            left = right = None
+        else:
+            left_mask, right_mask = split
+            self.ec_masks[mask] = self.ec_masks[left_mask] | self.ec_masks[right_mask]
+            left = BitmaskSubset(left_mask, tables, table_bits)
+            right = BitmaskSubset(right_mask, tables, table_bits)
+        
+        # Create plan (SQL will be generated later)
+        plan = EnumerationPlan(
+            subset=BitmaskSubset(mask, tables, table_bits),
+            left=left,
+            right=right,
+            sql=""  # Will be filled by SQL generator
+        )
+        
+        self.all_plans.append(plan)
@@ -4,11 +4,13 @@ Join Graph with Equivalence Classes and Transitive Closure
 This module implements the join graph data structure with:
 - Equivalence class construction using Union-Find
 - Column-aware transitive closure computation
-- BFS-based connectivity checking
+- Bitmask reachability-based connectivity checking
 """
 
-from typing import Dict, Set, List, Optional
-from constants import JoinDetail, TransitiveJoin
+import sys
+from typing import Dict, Set, List, Optional, FrozenSet, Iterable, Tuple
+from constants import JoinDetail, JoinPredicate, TransitiveJoin
+from utils import order_join_predicates
 
 
 class JoinGraph:
@@ -20,10 +22,28 @@ class JoinGraph:
     """
     
     def __init__(self):
-        self.edges: Set[str] = set()  # "t1|||t2" canonical keys
-        self.join_details: Dict[str, List[JoinDetail]] = {}  # edge -> join details
+        self.edges: Set[FrozenSet[str]] = set()  # frozenset({t1, t2}) edge keys
+        self.join_details: Dict[FrozenSet[str], List[JoinDetail]] = {}  # edge -> join details
+        self._detail_set: Set[Tuple[str, str, str, str]] = set()  # (t1, t1_col, t2, t2_col), sorted by table
         self.table_aliases: Dict[str, str] = {}  # alias -> base_table
         self.equivalence_classes: List[Set[str]] = []  # [{t1.col, t2.col}, ...]
+        self._ec_column_ids: List[FrozenSet[int]] = []  # ECs as interned column ids
+        self._tc_name: List[str] = []  # column id -> "table.column"
+        self._tc_table: List[str] = []  # column id -> table
+        self._ec_tables: List[FrozenSet[str]] = []  # EC index -> tables with a column in it
+        self.table_to_ecs: Dict[str, FrozenSet[int]] = {}  # table -> EC indices
+        self.table_ec_masks: Dict[str, int] = {}  # table -> bitmask of EC indices
+        self.table_index: Dict[str, int] = {}  # table in any EC -> bit index for adj_mask
+        self.adj_mask: List[int] = []  # bit index -> bitmask of tables sharing an EC
+        self._connected_cache: Dict[int, bool] = {}  # subset bitmask -> is_connected_mask result
+        self._neighbours: Optional[Dict[str, Dict[str, List[JoinPredicate]]]] = None  # Built by the neighbours property
+        
+        # Union-Find over joined table.column pairs, maintained by add_join
+        self._column_index: Dict[Tuple[str, str], int] = {}  # (table, column) -> column id
+        self._columns: List[Tuple[str, str]] = []  # column id -> (table, column)
+        self._uf_parent: List[int] = []
+        self._uf_rank: List[int] = []
+        self._ec_dirty = True  # Joins added since the last build_equivalence_classes
     
     def add_join(self, t1: str, t2: str, t1_col: str, t2_col: str, is_original: bool) -> None:
         """
@@ -36,8 +56,15 @@ class JoinGraph:
             t2_col: Column from second table
             is_original: True if from original query, False if transitive
         """
-        # Create canonical edge key (sorted)
-        edge = '|||'.join(sorted([t1, t2]))
+        # Interned names hash and compare by identity in every later lookup
+        t1 = sys.intern(t1)
+        t2 = sys.intern(t2)
+        if t1_col and t2_col:
+            t1_col = sys.intern(t1_col)
+            t2_col = sys.intern(t2_col)
+        
+        # Create canonical (unordered) edge key
+        edge = frozenset((t1, t2))
         self.edges.add(edge)
         
         # Track column details for transitive closure
@@ -46,7 +73,7 @@ class JoinGraph:
                 self.join_details[edge] = []
             
             # Normalize: always store in sorted table order
-            table1, table2 = sorted([t1, t2])
+            table1, table2 = (t1, t2) if t1 < t2 else (t2, t1)
             detail = JoinDetail(
                 t1=table1,
                 t1_col=t1_col if table1 == t1 else t2_col,
@@ -56,6 +83,28 @@ class JoinGraph:
             )
             
             self.join_details[edge].append(detail)
+            self._detail_set.add((detail.t1, detail.t1_col, detail.t2, detail.t2_col))
+            
+            # Keep column components current so ECs need no full rebuild
+            self._union(
+                self._intern_column(detail.t1, detail.t1_col),
+                self._intern_column(detail.t2, detail.t2_col)
+            )
+            self._ec_dirty = True
+            self._neighbours = None
+    
+    def edge_key(self, t1: str, t2: str) -> FrozenSet[str]:
+        """
+        Get canonical edge key for a pair of tables
+        
+        Args:
+            t1: First table alias
+            t2: Second table alias
+        
+        Returns:
+            Canonical key: frozenset({t1, t2}), independent of argument order
+        """
+        return frozenset((t1, t2))
     
     def build_equivalence_classes(self) -> int:
         """
@@ -63,61 +112,98 @@ class JoinGraph:
         
         Each equivalence class is a set of table.column strings that must be equal.
         
+        Union-Find is maintained by add_join; this groups the current
+        components and rebuilds the derived indexes. Without new joins since
+        the last call, it returns immediately.
+        
         Returns:
             Number of equivalence classes created
         """
-        # Union-Find data structures
-        parent: Dict[str, str] = {}
-        rank: Dict[str, int] = {}
-        
-        def find(x: str) -> str:
-            """Find root with path compression"""
-            if x not in parent:
-                parent[x] = x
-                rank[x] = 0
-            if parent[x] != x:
-                parent[x] = find(parent[x])  # Path compression
-            return parent[x]
-        
-        def union(x: str, y: str) -> None:
-            """Union by rank"""
-            root_x = find(x)
-            root_y = find(y)
-            
-            if root_x == root_y:
-                return
-            
-            # Union by rank
-            if rank[root_x] < rank[root_y]:
-                parent[root_x] = root_y
-            elif rank[root_x] > rank[root_y]:
-                parent[root_y] = root_x
-            else:
-                parent[root_y] = root_x
-                rank[root_x] += 1
-        
-        # Process all join details
-        for edge, details in self.join_details.items():
-            for detail in details:
-                # Create table.column identifiers
-                tc1 = f"{detail.t1}.{detail.t1_col}"
-                tc2 = f"{detail.t2}.{detail.t2_col}"
-                
-                # Union the two columns
-                union(tc1, tc2)
+        if not self._ec_dirty:
+            return len(self.equivalence_classes)
+        
+        columns, components = self._column_components()
+        
+        # Interned table.column ids: id -> "table.column" and id -> table
+        self._tc_name = [f"{table}.{column}" for table, column in columns]
+        self._tc_table = [table for table, _ in columns]
+        self._ec_column_ids = [frozenset(ids) for ids in components]
+        
+        # Public view keeps the table.column strings
+        self.equivalence_classes = [
+            {self._tc_name[tc_id] for tc_id in ids} for ids in self._ec_column_ids
+        ]
+        
+        # Tables whose columns appear in each EC
+        self._ec_tables = [
+            frozenset(self._tc_table[tc_id] for tc_id in ids) for ids in self._ec_column_ids
+        ]
+        
+        # Index ECs by table so EC-sharing checks are a set intersection
+        table_ecs: Dict[str, Set[int]] = {}
+        for idx, ec_tables in enumerate(self._ec_tables):
+            for table in ec_tables:
+                table_ecs.setdefault(table, set()).add(idx)
+        
+        self.table_to_ecs = {t: frozenset(ecs) for t, ecs in table_ecs.items()}
+        self.table_ec_masks = {
+            t: sum(1 << idx for idx in ecs) for t, ecs in table_ecs.items()
+        }
+        
+        # Adjacency bitmatrix: bit j of adj_mask[i] is set iff tables i and j share an EC
+        self.table_index = {t: i for i, t in enumerate(table_ecs)}
+        self.adj_mask = [0] * len(self.table_index)
+        self._connected_cache = {}
+        for ec_tables in self._ec_tables:
+            ec_mask = 0
+            for table in ec_tables:
+                ec_mask |= 1 << self.table_index[table]
+            for table in ec_tables:
+                self.adj_mask[self.table_index[table]] |= ec_mask
+        
+        self._ec_dirty = False
         
-        # Group by root to form equivalence classes
-        ec_groups: Dict[str, Set[str]] = {}
-        for tc in parent.keys():
-            root = find(tc)
-            if root not in ec_groups:
-                ec_groups[root] = set()
-            ec_groups[root].add(tc)
+        return len(self.equivalence_classes)
+    
+    @property
+    def neighbours(self) -> Dict[str, Dict[str, List[JoinPredicate]]]:
+        """
+        Join predicates indexed by table pair
         
-        # Convert to list of sets
-        self.equivalence_classes = list(ec_groups.values())
+        For each table, maps every table it has a join with to the rendered
+        join predicates between the two, original joins first. Built on
+        first access and again after add_join changes join_details.
+        """
+        if self._neighbours is None:
+            self._neighbours = self._build_neighbours()
+        return self._neighbours
+    
+    def _build_neighbours(self) -> Dict[str, Dict[str, List[JoinPredicate]]]:
+        """
+        Index join predicates by table pair; see neighbours
         
-        return len(self.equivalence_classes)
+        Returns:
+            Mapping of table -> neighbour -> join predicates
+        """
+        neighbours: Dict[str, Dict[str, List[JoinPredicate]]] = {}
+        
+        for edge, details in self.join_details.items():
+            if len(edge) != 2:
+                continue
+            
+            predicates = order_join_predicates(
+                JoinPredicate(
+                    predicate=f"{d.t1}.{d.t1_col} = {d.t2}.{d.t2_col}",
+                    is_original=d.is_original
+                )
+                for d in details
+            )
+            
+            t1, t2 = edge
+            neighbours.setdefault(t1, {})[t2] = predicates
+            neighbours.setdefault(t2, {})[t1] = predicates
+        
+        return neighbours
     
     def compute_transitive_closure(self) -> int:
         """
@@ -126,93 +212,96 @@ class JoinGraph:
         Only adds transitive joins when columns match on the shared table.
         Example: A.x=B.y AND B.y=C.z => A.x=C.z (columns match on B)
         
+        Joined table.column pairs are merged with union-find; every two
+        columns of one component on different tables must be equal, so
+        each such pair that is not already a join is added.
+        
         Returns:
             Number of transitive joins added
         """
         added_count = 0
-        max_iterations = 10
+        columns, components = self._column_components()
         
-        for iteration in range(max_iterations):
-            found_new = False
-            current_edges = list(self.join_details.items())
-            
-            # Try to find new transitive joins
-            for edge1_key, details1 in current_edges:
-                for edge2_key, details2 in current_edges:
-                    if edge1_key == edge2_key:
+        for component in components:
+            for i, first in enumerate(component):
+                t1, t1_col = columns[first]
+                
+                for second in component[i + 1:]:
+                    t2, t2_col = columns[second]
+                    if t1 == t2:
                         continue
                     
-                    for d1 in details1:
-                        for d2 in details2:
-                            transitive = self._try_form_transitive_join(d1, d2)
-                            
-                            if transitive and transitive.t1 != transitive.t2:
-                                if not self._join_exists(transitive):
-                                    self.add_join(
-                                        transitive.t1,
-                                        transitive.t2,
-                                        transitive.t1_col,
-                                        transitive.t2_col,
-                                        is_original=False
-                                    )
-                                    added_count += 1
-                                    found_new = True
-            
-            if not found_new:
-                break
+                    transitive = TransitiveJoin(t1=t1, t1_col=t1_col, t2=t2, t2_col=t2_col)
+                    if not self._join_exists(transitive):
+                        self.add_join(t1, t2, t1_col, t2_col, is_original=False)
+                        added_count += 1
         
         return added_count
     
-    def _try_form_transitive_join(self, d1: JoinDetail, d2: JoinDetail) -> Optional[TransitiveJoin]:
+    def _column_components(self) -> Tuple[List[Tuple[str, str]], List[List[int]]]:
         """
-        Try to form a transitive join from two join details
+        Group joined table.column pairs into connected components
         
-        Checks 4 cases for how two joins might share a table with matching columns.
-        
-        Args:
-            d1: First join detail
-            d2: Second join detail
+        Reads the Union-Find maintained by add_join; table.column pairs are
+        interned to ints in order of first appearance.
         
         Returns:
-            TransitiveJoin if valid, None otherwise
+            Tuple of (columns, components)
+            - columns: column id -> (table, column)
+            - components: Lists of column ids, ascending, ordered by smallest id
         """
-        # Case 1: d1.t2 = d2.t1 with matching columns
-        if d1.t2 == d2.t1 and d1.t2_col == d2.t1_col:
-            return TransitiveJoin(
-                t1=d1.t1,
-                t1_col=d1.t1_col,
-                t2=d2.t2,
-                t2_col=d2.t2_col
-            )
+        groups: Dict[int, List[int]] = {}
+        for tc_id in range(len(self._uf_parent)):
+            groups.setdefault(self._find(tc_id), []).append(tc_id)
         
-        # Case 2: d1.t2 = d2.t2 with matching columns
-        if d1.t2 == d2.t2 and d1.t2_col == d2.t2_col:
-            return TransitiveJoin(
-                t1=d1.t1,
-                t1_col=d1.t1_col,
-                t2=d2.t1,
-                t2_col=d2.t1_col
-            )
+        return self._columns, list(groups.values())
+    
+    def _intern_column(self, table: str, column: str) -> int:
+        """Get id of table.column, creating a singleton set if new"""
+        key = (table, column)
+        tc_id = self._column_index.get(key)
+        if tc_id is None:
+            tc_id = len(self._uf_parent)
+            self._column_index[key] = tc_id
+            self._columns.append(key)
+            self._uf_parent.append(tc_id)
+            self._uf_rank.append(0)
+        return tc_id
+    
+    def _find(self, x: int) -> int:
+        """Find root with iterative path compression"""
+        parent = self._uf_parent
         
-        # Case 3: d1.t1 = d2.t1 with matching columns
-        if d1.t1 == d2.t1 and d1.t1_col == d2.t1_col:
-            return TransitiveJoin(
-                t1=d1.t2,
-                t1_col=d1.t2_col,
-                t2=d2.t2,
-                t2_col=d2.t2_col
-            )
+        # First pass: walk up to the root
+        root = x
+        while parent[root] != root:
+            root = parent[root]
         
-        # Case 4: d1.t1 = d2.t2 with matching columns
-        if d1.t1 == d2.t2 and d1.t1_col == d2.t2_col:
-            return TransitiveJoin(
-                t1=d1.t2,
-                t1_col=d1.t2_col,
-                t2=d2.t1,
-                t2_col=d2.t1_col
-            )
+        # Second pass: point every node on the path at the root
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
         
-        return None
+        return root
+    
+    def _union(self, x: int, y: int) -> None:
+        """Union by rank"""
+        root_x = self._find(x)
+        root_y = self._find(y)
+        
+        if root_x == root_y:
+            return
+        
+        parent = self._uf_parent
+        rank = self._uf_rank
+        
+        # Union by rank
+        if rank[root_x] < rank[root_y]:
+            parent[root_x] = root_y
+        elif rank[root_x] > rank[root_y]:
+            parent[root_y] = root_x
+        else:
+            parent[root_y] = root_x
+            rank[root_x] += 1
     
     def _join_exists(self, transitive: TransitiveJoin) -> bool:
         """
@@ -224,28 +313,19 @@ class JoinGraph:
         Returns:
             True if join exists, False otherwise
         """
-        edge = '|||'.join(sorted([transitive.t1, transitive.t2]))
-        existing = self.join_details.get(edge)
+        # Normalize to sorted table order, as stored by add_join
+        if transitive.t1 <= transitive.t2:
+            key = (transitive.t1, transitive.t1_col, transitive.t2, transitive.t2_col)
+        else:
+            key = (transitive.t2, transitive.t2_col, transitive.t1, transitive.t1_col)
         
-        if not existing:
-            return False
-        
-        # Check if this exact join already exists
-        for detail in existing:
-            # Check both directions
-            if ((detail.t1 == transitive.t1 and detail.t1_col == transitive.t1_col and
-                 detail.t2 == transitive.t2 and detail.t2_col == transitive.t2_col) or
-                (detail.t1 == transitive.t2 and detail.t1_col == transitive.t2_col and
-                 detail.t2 == transitive.t1 and detail.t2_col == transitive.t1_col)):
-                return True
-        
-        return False
+        return key in self._detail_set
     
     def is_connected(self, subset: Set[str]) -> bool:
         """
         Check if a subset of tables is connected via equivalence classes
         
-        Uses BFS to traverse the join graph via EC membership.
+        Converts the subset to a table bitmask and runs is_connected_mask.
         
         Args:
             subset: Set of table aliases
@@ -256,22 +336,52 @@ class JoinGraph:
         if len(subset) <= 1:
             return True
         
-        subset_list = list(subset)
-        start = subset_list[0]
+        subset_mask = 0
+        for t in subset:
+            idx = self.table_index.get(t)
+            if idx is None:
+                # Table is in no EC, so it cannot reach any other table
+                return False
+            subset_mask |= 1 << idx
         
-        visited = {start}
-        queue = [start]
+        return self.is_connected_mask(subset_mask)
+    
+    def is_connected_mask(self, subset_mask: int) -> bool:
+        """
+        Check if a subset of tables, as a table_index bitmask, is connected
+        
+        Grows the set reachable from the lowest table by OR-ing adjacency rows
+        until it stops changing (at most one round per table). Results are
+        cached per subset until the equivalence classes are rebuilt.
+        
+        Args:
+            subset_mask: Bitmask over table_index
         
-        while queue:
-            current = queue.pop(0)
+        Returns:
+            True if every table in the subset is reachable
+        """
+        connected = self._connected_cache.get(subset_mask)
+        if connected is not None:
+            return connected
+        
+        reach = subset_mask & -subset_mask
+        
+        while True:
+            new = reach
+            rest = reach
+            while rest:
+                bit = rest & -rest
+                new |= self.adj_mask[bit.bit_length() - 1]
+                rest ^= bit
+            new &= subset_mask
             
-            # Find all tables that share an EC with current
-            for other in subset:
-                if other not in visited and self.are_in_same_ec(current, other):
-                    visited.add(other)
-                    queue.append(other)
+            if new == reach:
+                break
+            reach = new
         
-        return len(visited) == len(subset)
+        connected = reach == subset_mask
+        self._connected_cache[subset_mask] = connected
+        return connected
     
     def are_in_same_ec(self, t1: str, t2: str) -> bool:
         """
@@ -284,21 +394,30 @@ class JoinGraph:
         Returns:
             True if tables share an EC, False otherwise
         """
-        for ec in self.equivalence_classes:
-            # Check if this EC contains columns from both tables
-            has_t1 = any(tc.startswith(f"{t1}.") for tc in ec)
-            has_t2 = any(tc.startswith(f"{t2}.") for tc in ec)
-            
-            if has_t1 and has_t2:
-                return True
+        masks = self.table_ec_masks
+        return (masks.get(t1, 0) & masks.get(t2, 0)) != 0
+    
+    def ec_mask(self, tables: Iterable[str]) -> int:
+        """
+        Get bitmask of all equivalence classes touched by a set of tables
+        
+        Args:
+            tables: Table aliases
         
-        return False
+        Returns:
+            OR of the per-table EC bitmasks (0 if no table is in any EC)
+        """
+        mask = 0
+        for t in tables:
+            mask |= self.table_ec_masks.get(t, 0)
+        return mask
     
     def can_join(self, left: Set[str], right: Set[str]) -> bool:
         """
         Check if two subsets can be joined
         
-        Returns True if any table from left shares an EC with any table from right.
+        Returns True if any table from left shares an EC with any table from right,
+        i.e. the EC bitmasks of the two subsets intersect.
         
         Args:
             left: Left subset of tables
@@ -307,10 +426,9 @@ class JoinGraph:
         Returns:
             True if subsets can join, False otherwise
         """
-        for l in left:
-            for r in right:
-                if self.are_in_same_ec(l, r):
-                    return True
+        left_mask = self.ec_mask(left)
+        if not left_mask:
+            # Left side is in no EC: skip building the right mask
+            return False
         
-        return False
-
+        return (left_mask & self.ec_mask(right)) != 0
@@ -7,7 +7,9 @@ Command-line interface for enumerating join subsets and generating CSV output.
 import argparse
 import csv
 import sys
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
 
 try:
     from tqdm import tqdm
@@ -42,6 +44,12 @@ Examples:
 
   # Stop on first error
   python main.py queries.sql --stop-on-error --verbose
+
+  # Process queries in 4 worker processes
+  python main.py queries.sql --workers 4
+
+  # Wide queries: Iterative DP over windows of 8 tables
+  python main.py queries.sql --strategy idp --idp-window 8
         """
     )
     
@@ -58,9 +66,18 @@ Examples:
                        help='Verbose output')
     parser.add_argument('--max-level', type=int, default=20,
                        help='Maximum enumeration level (default: 20)')
+    parser.add_argument('--workers', '-j', type=int, default=1,
+                       help='Number of worker processes (default: 1, no multiprocessing)')
+    parser.add_argument('--strategy', choices=['exact', 'idp'], default='exact',
+                       help='Enumeration strategy; idp bounds work for wide queries (default: exact)')
+    parser.add_argument('--idp-window', type=int, default=10,
+                       help='Tables per DP round with --strategy idp (default: 10)')
     
     args = parser.parse_args()
     
+    if args.idp_window < 2:
+        parser.error(f"--idp-window must be at least 2, got {args.idp_window}")
+    
     # Read queries
     try:
         queries = read_queries_from_file(args.input_file, args.semicolon_separated)
@@ -79,8 +96,17 @@ Examples:
     results = []
     errors = []
     
+    # Queries are independent: with several workers, process them in a pool.
+    # map() yields outcomes in input order, so the output order is unchanged.
+    executor = None
+    outcomes = None
+    if args.workers > 1:
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+        tasks = [(query_id, query_text, args) for query_id, (_, query_text) in enumerate(queries, 1)]
+        outcomes = executor.map(_process_query_task, tasks)
+    
     try:
-        with open(args.output, 'w', newline='') as csvfile:
+        with open(args.output, 'w', newline='', buffering=1 << 20) as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=['query_id', 'subset', 'query'])
             writer.writeheader()
             
@@ -88,15 +114,33 @@ Examples:
             
             for query_id, (line_num, query_text) in enumerate(progress_bar, 1):
                 try:
-                    rows = process_query(query_text, query_id, args)
+                    if outcomes is not None:
+                        rows, error = next(outcomes)
+                        if error is not None:
+                            raise ValueError(error)
+                    else:
+                        # Collect the whole query first, so a query that
+                        # fails part-way leaves no rows in the output
+                        rows = list(process_query(query_text, query_id, args))
                     
-                    for row in rows:
-                        writer.writerow(row)
+                    writer.writerows(rows)
+                    num_rows = len(rows)
                     
-                    results.append((query_id, len(rows)))
+                    results.append((query_id, num_rows))
                     
                     if args.verbose:
-                        progress_bar.write(f"Query {query_id}: {len(rows)} subsets")
+                        progress_bar.write(f"Query {query_id}: {num_rows} subsets")
+                
+                except BrokenProcessPool:
+                    # The pool cannot run the remaining queries; later next()
+                    # calls would only raise an empty StopIteration
+                    print(
+                        f"\nERROR: A worker process died at line {line_num} "
+                        f"(e.g. out of memory); aborting. Rerun with --workers 1 "
+                        f"to find the failing query.",
+                        file=sys.stderr
+                    )
+                    sys.exit(1)
                 
                 except Exception as e:
                     error_msg = f"ERROR at line {line_num}: {str(e)}"
@@ -115,6 +159,10 @@ Examples:
         print(f"\nERROR: Failed to write output file: {e}", file=sys.stderr)
         sys.exit(1)
     
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    
     # Print summary
     print(f"\nCompleted: {len(results)}/{len(queries)} queries")
     if errors:
@@ -122,17 +170,20 @@ Examples:
     print(f"Output written to: {args.output}")
 
 
-def process_query(sql: str, query_id: int, args) -> List[Dict]:
+def process_query(sql: str, query_id: int, args) -> Iterator[Dict]:
     """
-    Process a single SQL query and return CSV rows
+    Process a single SQL query and yield CSV rows
+    
+    Rows are yielded one at a time. A query can fail after yielding some,
+    so callers that must not write partial output collect them first.
     
     Args:
         sql: SQL query string
         query_id: Query identifier
         args: Command-line arguments
     
-    Returns:
-        List of dicts with keys: query_id, subset, query
+    Yields:
+        Dicts with keys: query_id, subset, query
     """
     # Parse SQL
     parsed = parse_sql(sql, dialect=args.dialect)
@@ -144,7 +195,9 @@ def process_query(sql: str, query_id: int, args) -> List[Dict]:
     enumerator = PostgreSQLJoinEnumerator(parsed.join_graph)
     enum_result = enumerator.enumerate_subsets(
         parsed.tables, 
-        max_level=min(args.max_level, 20)
+        max_level=min(args.max_level, 20),
+        strategy=args.strategy,
+        idp_window=args.idp_window
     )
     
     if args.verbose:
@@ -153,17 +206,34 @@ def process_query(sql: str, query_id: int, args) -> List[Dict]:
     # Generate SQL for each subset
     generator = SubqueryGenerator(parsed.aliases, parsed.classifier, parsed.join_graph)
     
-    rows = []
     for plan in enum_result.all_plans:
         sql_query = generator.generate_subquery(plan.subset, plan.left, plan.right)
         if len(plan.subset) > 1:    
-            rows.append({
+            yield {
                 'query_id': query_id,
                 'subset': format_subset(plan.subset),
                 'query': str(sql_query).replace('\n', ' ')
-            })
+            }
+
+
+def _process_query_task(task: Tuple[int, str, argparse.Namespace]) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Process a single query in a worker process
+    
+    Errors are returned rather than raised so one failing query does not
+    abort the remaining results.
+    
+    Args:
+        task: Tuple of (query_id, sql, args)
     
-    return rows
+    Returns:
+        Tuple of (rows, error message or None)
+    """
+    query_id, sql, args = task
+    try:
+        return list(process_query(sql, query_id, args)), None
+    except Exception as e:
+        return [], str(e)
 
 
 if __name__ == '__main__':
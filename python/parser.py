@@ -6,8 +6,11 @@ It also detects constant-equality joins where multiple tables constrain the same
 column to the same single value.
 """
 
-import re
-from typing import List, Tuple, Dict, Set, Optional
+import sys
+from collections import defaultdict, deque
+from functools import lru_cache
+from itertools import islice
+from typing import List, Tuple, Dict, Set, Optional, Iterator
 import sqlglot
 from sqlglot import parse_one, exp
 
@@ -19,10 +22,20 @@ from constants import (
 )
 
 
+@lru_cache(maxsize=1024)
 def parse_sql(sql: str, dialect: str = 'postgres') -> ParsedSQL:
     """
     Parse SQL query and extract all information needed for enumeration
     
+    Results are memoised per (sql, dialect) in a bounded LRU cache, so repeated
+    queries skip parsing entirely. The cache is keyed on the exact SQL text:
+    rewriting it (even whitespace) could change quoted literals such as
+    $$...$$ or E'...' strings. The returned ParsedSQL (including its
+    join_graph and classifier) is shared between callers and must be treated
+    as read-only: enumerating and generating SQL from it is fine, but adding
+    joins or predicates would leak into every later parse of the same SQL.
+    Use parse_sql.cache_clear() to reset the cache.
+    
     Args:
         sql: SQL query string
         dialect: SQL dialect for SQLglot parsing
@@ -43,8 +56,14 @@ def parse_sql(sql: str, dialect: str = 'postgres') -> ParsedSQL:
     except Exception as e:
         raise ValueError(f"Failed to parse SQL: {e}")
     
+    # Collect Table, Join and Where nodes in a single traversal
+    table_nodes, join_nodes, where_node = _collect_nodes(ast)
+    
+    # Split WHERE into its AND-ed conditions once; joins and predicates share them
+    where_conditions = _split_where_conditions(where_node.this) if where_node else []
+    
     # Extract tables and aliases
-    tables, aliases = _extract_tables(ast)
+    tables, aliases = _extract_tables(table_nodes)
     
     if not tables:
         raise ValueError("No tables found in query")
@@ -58,7 +77,7 @@ def parse_sql(sql: str, dialect: str = 'postgres') -> ParsedSQL:
         join_graph.table_aliases[alias] = base_name
     
     # Extract join conditions from JOIN clauses and WHERE clause
-    join_conditions = _extract_joins_from_ast(ast)
+    join_conditions = _extract_joins_from_ast(join_nodes, where_conditions)
     
     # Add explicit joins to join graph
     for join_cond in join_conditions:
@@ -71,14 +90,11 @@ def parse_sql(sql: str, dialect: str = 'postgres') -> ParsedSQL:
         )
     
     # Extract all predicates from WHERE clause
-    predicates = _extract_predicates_from_where(ast)
+    predicates = _extract_predicates_from_where(where_conditions)
     
     # Add predicates to classifier
-    for predicate_text, table_set in predicates:
-        classifier.add_predicate(predicate_text, table_set)
-    
-    # Classify predicates
-    classifier.classify_predicates()
+    for predicate_text, table_set, condition in predicates:
+        classifier.add_predicate(predicate_text, table_set, condition)
     
     # Detect constant-equality joins (e.g., t1.col='X' AND t2.col='X' => t1.col=t2.col)
     constant_joins = _detect_constant_equality_joins(classifier, tables)
@@ -107,13 +123,64 @@ def parse_sql(sql: str, dialect: str = 'postgres') -> ParsedSQL:
     )
 
 
-def _extract_tables(ast: exp.Expression) -> Tuple[List[str], Dict[str, str]]:
+def _walk_nodes(root: exp.Expression) -> Iterator[exp.Expression]:
+    """
+    Iterate over all nodes of an AST subtree in breadth-first order
+    
+    Uses an explicit queue instead of recursion. Visits nodes in the same
+    order as sqlglot's find_all.
+    
+    Args:
+        root: Root of the subtree
+    
+    Yields:
+        Every expression node in the subtree, root first
+    """
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        yield node
+        queue.extend(node.iter_expressions())
+
+
+def _collect_nodes(
+    ast: exp.Expression
+) -> Tuple[List[exp.Table], List[exp.Join], Optional[exp.Where]]:
     """
-    Extract tables and aliases from AST
+    Collect Table, Join and Where nodes in one pass over the AST
     
     Args:
         ast: SQLglot AST
     
+    Returns:
+        Tuple of (table_nodes, join_nodes, where_node)
+        - table_nodes: All Table nodes, in traversal order
+        - join_nodes: All Join nodes, in traversal order
+        - where_node: First Where node, or None if there is no WHERE clause
+    """
+    table_nodes = []
+    join_nodes = []
+    where_node = None
+    
+    for node in _walk_nodes(ast):
+        node_type = type(node)
+        if node_type is exp.Table:
+            table_nodes.append(node)
+        elif node_type is exp.Join:
+            join_nodes.append(node)
+        elif node_type is exp.Where and where_node is None:
+            where_node = node
+    
+    return table_nodes, join_nodes, where_node
+
+
+def _extract_tables(table_nodes: List[exp.Table]) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Extract tables and aliases from Table nodes
+    
+    Args:
+        table_nodes: Table nodes from FROM and JOIN clauses
+    
     Returns:
         Tuple of (table_list, alias_map)
         - table_list: List of table aliases (or base names if no alias)
@@ -122,8 +189,7 @@ def _extract_tables(ast: exp.Expression) -> Tuple[List[str], Dict[str, str]]:
     tables = []
     aliases = {}
     
-    # Find all Table nodes in FROM and JOIN clauses
-    for table_node in ast.find_all(exp.Table):
+    for table_node in table_nodes:
         # Get base table name
         base_name = table_node.name
         
@@ -133,15 +199,20 @@ def _extract_tables(ast: exp.Expression) -> Tuple[List[str], Dict[str, str]]:
         else:
             alias = base_name
         
-        # Add to results
-        if alias not in tables:
+        # Add to results; the alias map doubles as the seen-set
+        if alias not in aliases:
+            # Interned so later dict and set lookups can match by identity
+            alias = sys.intern(alias)
             tables.append(alias)
-            aliases[alias] = base_name
+            aliases[alias] = sys.intern(base_name)
     
     return tables, aliases
 
 
-def _extract_joins_from_ast(ast: exp.Expression) -> List[JoinCondition]:
+def _extract_joins_from_ast(
+    join_nodes: List[exp.Join],
+    where_conditions: List[exp.Expression]
+) -> List[JoinCondition]:
     """
     Extract join conditions from JOIN clauses and WHERE clause
     
@@ -150,7 +221,8 @@ def _extract_joins_from_ast(ast: exp.Expression) -> List[JoinCondition]:
     - Legacy syntax: FROM t1, t2 WHERE t1.x = t2.y
     
     Args:
-        ast: SQLglot AST
+        join_nodes: Join nodes from the AST
+        where_conditions: AND-ed conditions of the WHERE clause
     
     Returns:
         List of JoinCondition objects
@@ -158,16 +230,14 @@ def _extract_joins_from_ast(ast: exp.Expression) -> List[JoinCondition]:
     join_conditions = []
     
     # Extract from explicit JOIN...ON clauses
-    for join_node in ast.find_all(exp.Join):
-        if join_node.on:
-            conditions = _extract_join_conditions_from_expression(join_node.on)
+    for join_node in join_nodes:
+        on_expr = join_node.args.get('on')
+        if on_expr:
+            conditions = _extract_join_conditions_from_expression(on_expr)
             join_conditions.extend(conditions)
     
     # Extract from WHERE clause (handles legacy comma-separated syntax)
-    where_node = ast.find(exp.Where)
-    if where_node:
-        conditions = _extract_join_conditions_from_expression(where_node.this)
-        join_conditions.extend(conditions)
+    join_conditions.extend(_extract_join_conditions(where_conditions))
     
     return join_conditions
 
@@ -184,19 +254,27 @@ def _extract_join_conditions_from_expression(expr: exp.Expression) -> List[JoinC
     Returns:
         List of JoinCondition objects
     """
-    join_conditions = []
+    return _extract_join_conditions(_flatten_and(expr))
+
+
+def _extract_join_conditions(conditions: List[exp.Expression]) -> List[JoinCondition]:
+    """
+    Extract join conditions from a list of AND-ed conditions
+    
+    Args:
+        conditions: Individual conditions (no AND nodes)
     
-    # Handle AND chains
-    if isinstance(expr, exp.And):
-        # Recursively process left and right
-        join_conditions.extend(_extract_join_conditions_from_expression(expr.left))
-        join_conditions.extend(_extract_join_conditions_from_expression(expr.right))
+    Returns:
+        List of JoinCondition objects
+    """
+    join_conditions = []
     
-    # Handle EQ (equality) expressions
-    elif isinstance(expr, exp.EQ):
-        join_cond = _extract_join_condition_from_eq(expr)
-        if join_cond:
-            join_conditions.append(join_cond)
+    # Only equality expressions can be join conditions
+    for condition in conditions:
+        if type(condition) is exp.EQ:
+            join_cond = _extract_join_condition_from_eq(condition)
+            if join_cond:
+                join_conditions.append(join_cond)
     
     return join_conditions
 
@@ -217,7 +295,7 @@ def _extract_join_condition_from_eq(eq_expr: exp.EQ) -> Optional[JoinCondition]:
     right = eq_expr.right
     
     # Both sides must be Column references
-    if isinstance(left, exp.Column) and isinstance(right, exp.Column):
+    if type(left) is exp.Column and type(right) is exp.Column:
         # Extract table and column names
         left_table = left.table if left.table else None
         left_col = left.name
@@ -228,47 +306,44 @@ def _extract_join_condition_from_eq(eq_expr: exp.EQ) -> Optional[JoinCondition]:
         # Both must have table qualifiers
         if left_table and right_table and left_table != right_table:
             return JoinCondition(
-                left_table=left_table,
-                left_column=left_col,
-                right_table=right_table,
-                right_column=right_col
+                left_table=sys.intern(left_table),
+                left_column=sys.intern(left_col),
+                right_table=sys.intern(right_table),
+                right_column=sys.intern(right_col)
             )
     
     return None
 
 
-def _extract_predicates_from_where(ast: exp.Expression) -> List[Tuple[str, Set[str]]]:
+def _extract_predicates_from_where(
+    where_conditions: List[exp.Expression]
+) -> List[Tuple[str, Set[str], exp.Expression]]:
     """
     Extract all predicates from WHERE clause
     
     Returns predicates as strings along with the set of tables they reference
+    and the condition expression they were rendered from
     
     Args:
-        ast: SQLglot AST
+        where_conditions: AND-ed conditions of the WHERE clause
     
     Returns:
-        List of (predicate_string, table_set) tuples
+        List of (predicate_string, table_set, condition) tuples
     """
     predicates = []
     
-    where_node = ast.find(exp.Where)
-    if not where_node:
-        return predicates
-    
-    # Break WHERE into individual conditions (split by AND)
-    conditions = _split_where_conditions(where_node.this)
-    
-    for condition in conditions:
+    for condition in where_conditions:
         # Convert condition to SQL string
         predicate_text = condition.sql()
         
-        # Extract tables referenced in this condition
+        # Extract tables referenced in this condition, interned like the
+        # aliases they are matched against
         tables = set()
-        for col in condition.find_all(exp.Column):
-            if col.table:
-                tables.add(col.table)
+        for node in _walk_nodes(condition):
+            if type(node) is exp.Column and node.table:
+                tables.add(sys.intern(node.table))
         
-        predicates.append((predicate_text, tables))
+        predicates.append((predicate_text, tables, condition))
     
     return predicates
 
@@ -277,7 +352,7 @@ def _split_where_conditions(expr: exp.Expression) -> List[exp.Expression]:
     """
     Split WHERE expression into individual conditions
     
-    Recursively splits AND chains into individual conditions
+    Splits AND chains into individual conditions
     
     Args:
         expr: WHERE expression
@@ -285,14 +360,35 @@ def _split_where_conditions(expr: exp.Expression) -> List[exp.Expression]:
     Returns:
         List of individual condition expressions
     """
-    if isinstance(expr, exp.And):
-        # Recursively split left and right
-        left_conditions = _split_where_conditions(expr.left)
-        right_conditions = _split_where_conditions(expr.right)
-        return left_conditions + right_conditions
-    else:
-        # Base case: single condition
-        return [expr]
+    return _flatten_and(expr)
+
+
+def _flatten_and(expr: exp.Expression) -> List[exp.Expression]:
+    """
+    Flatten an AND chain into its conjuncts
+    
+    Uses an explicit stack instead of recursion; conjuncts are returned
+    left to right, as they appear in the query.
+    
+    Args:
+        expr: Expression, possibly an AND chain
+    
+    Returns:
+        List of non-AND conjunct expressions
+    """
+    conjuncts = []
+    stack = [expr]
+    
+    while stack:
+        node = stack.pop()
+        if type(node) is exp.And:
+            # Push right first so the left side is visited first
+            stack.append(node.right)
+            stack.append(node.left)
+        else:
+            conjuncts.append(node)
+    
+    return conjuncts
 
 
 def _detect_constant_equality_joins(
@@ -309,6 +405,12 @@ def _detect_constant_equality_joins(
     - Valid: t1.col IN ('X') AND t2.col IN ('X')
     - Invalid: t1.col IN ('X', 'Y') AND t2.col IN ('X', 'Y')
     
+    Constants are read from the predicates' parsed expressions; predicates
+    added to the classifier without one are parsed here first.
+    
+    A group of k tables sharing a constant yields k-1 joins to the group's
+    first table rather than every pair.
+    
     Args:
         classifier: PredicateClassifier with selection predicates
         tables: List of table aliases
@@ -316,108 +418,111 @@ def _detect_constant_equality_joins(
     Returns:
         List of ConstantEqualityJoin objects
     """
-    # Map: "column:value" -> [ConstantValue, ...]
-    constant_groups: Dict[str, List[ConstantValue]] = {}
+    # Map: (column, value) -> [table, ...]
+    constant_groups: Dict[Tuple[str, str], List[str]] = defaultdict(list)
     
     # Scan all tables for single-value constant predicates
     for table in tables:
         predicates = classifier.get_predicates_for_subset([table])
         
         for pred in predicates.selections:
-            const_val = _extract_single_constant_value(pred)
+            expr = classifier.predicate_exprs.get(pred)
+            if expr is None:
+                expr = _parse_predicate(pred)
+            
+            const_val = _constant_value_from_expression(expr) if expr is not None else None
             if const_val:
-                key = f"{const_val.column}:{const_val.value}"
-                
-                if key not in constant_groups:
-                    constant_groups[key] = []
-                constant_groups[key].append(const_val)
+                group = constant_groups[(const_val.column, const_val.value)]
+                # Tables are scanned one at a time, so a repeat is always last
+                if not group or group[-1] != const_val.table:
+                    group.append(const_val.table)
     
     # Generate joins for groups with 2+ tables
     constant_joins = []
     
-    for key, group in constant_groups.items():
+    for (column, _), group in constant_groups.items():
         if len(group) >= 2:
-            # Create join between each pair
-            for i in range(len(group)):
-                for j in range(i + 1, len(group)):
-                    constant_joins.append(ConstantEqualityJoin(
-                        t1=group[i].table,
-                        t2=group[j].table,
-                        column=group[i].column
-                    ))
+            # Join every other table to the first one; transitive closure
+            # and the equivalence classes supply the remaining pairs
+            anchor = group[0]
+            constant_joins.extend(
+                ConstantEqualityJoin(t1=anchor, t2=other, column=column)
+                for other in islice(group, 1, None)
+            )
     
     return constant_joins
 
 
-def _extract_single_constant_value(predicate: str) -> Optional[ConstantValue]:
+def _parse_predicate(predicate: str) -> Optional[exp.Expression]:
     """
-    Extract single constant value from a predicate
-    
-    Returns ConstantValue only if predicate constrains column to ONE value
+    Parse a predicate added to the classifier without its expression
     
-    Valid patterns:
-    - table.column = 'value'
-    - table.column = 123
-    - table.column IN ('value')  -- single value only
-    
-    Invalid patterns:
-    - table.column IN ('a', 'b')  -- multiple values
-    - table.column > 10  -- not equality
+    Predicate text comes from condition.sql(), so it is parsed back with
+    sqlglot's default dialect.
     
     Args:
-        predicate: Predicate string
+        predicate: Predicate SQL text
     
     Returns:
-        ConstantValue if single-value constraint, None otherwise
+        Parsed condition, or None if the text does not parse
     """
-    # Pattern 1: table.column = constant
-    eq_match = re.search(r'(\w+)\.(\w+)\s*=\s*(.+?)(?:\s+(?:AND|OR)|$)', predicate, re.IGNORECASE)
-    if eq_match:
-        table = eq_match.group(1)
-        column = eq_match.group(2)
-        raw_value = eq_match.group(3)
-        value = _normalize_value(raw_value)
-        return ConstantValue(table=table, column=column, value=value)
-    
-    # Pattern 2: table.column IN (...)
-    in_match = re.search(r'(\w+)\.(\w+)\s+IN\s*\(([^)]+)\)', predicate, re.IGNORECASE)
-    if in_match:
-        table = in_match.group(1)
-        column = in_match.group(2)
-        value_list = in_match.group(3)
-        
-        # Split by comma and count values
-        values = [v.strip() for v in value_list.split(',')]
-        
-        # Only valid if exactly ONE value
-        if len(values) == 1:
-            normalized = _normalize_value(values[0])
-            return ConstantValue(table=table, column=column, value=normalized)
-    
-    return None
+    try:
+        return sqlglot.condition(predicate)
+    except sqlglot.errors.SqlglotError:
+        return None
 
 
-def _normalize_value(raw_value: str) -> str:
+def _constant_value_from_expression(expr: exp.Expression) -> Optional[ConstantValue]:
     """
-    Normalize a constant value
+    Extract single constant value from a parsed predicate
     
-    Removes:
-    - Quotes (single and double)
-    - Type casts (::type)
-    - Whitespace
+    Accepts table.column = constant and table.column IN (constant), where
+    the constant is a literal, optionally negated, cast or parenthesized.
+    Anything else (OR, column = column, functions, subqueries) is None.
     
     Args:
-        raw_value: Raw value string from SQL
+        expr: Predicate expression
     
     Returns:
-        Normalized value
+        ConstantValue if single-value constraint, None otherwise
     """
-    normalized = raw_value.strip()
+    expr_type = type(expr)
+    
+    if expr_type is exp.EQ:
+        column, value = expr.left, expr.right
+    elif expr_type is exp.In and not expr.args.get('query') and len(expr.expressions) == 1:
+        column, value = expr.this, expr.expressions[0]
+    else:
+        return None
     
-    # Remove quotes
-    normalized = re.sub(r"^['\"]|['\"]$", '', normalized)
+    if type(column) is not exp.Column or not column.table:
+        return None
     
-    # Remove type casts
-    normalized = re.sub(r'::\w+$', '', normalized)
+    value_text = _literal_text(value)
+    if value_text is None:
+        return None
     
-    return normalized.strip()
\ No newline at end of file
+    return ConstantValue(table=column.table, column=column.name, value=value_text)
+
+
+def _literal_text(value: exp.Expression) -> Optional[str]:
+    """
+    Get the text of a constant, looking through casts and parentheses
+    
+    Args:
+        value: Right-hand side of a predicate
+    
+    Returns:
+        Literal text without quotes, or None if value is not a constant
+    """
+    while type(value) in (exp.Cast, exp.Paren):
+        value = value.this
+    
+    value_type = type(value)
+    if value_type is exp.Literal:
+        return value.this
+    if value_type is exp.Neg and type(value.this) is exp.Literal and value.this.is_number:
+        return '-' + value.this.this
+    if value_type is exp.Boolean:
+        return value.sql()
+    return None
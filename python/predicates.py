@@ -1,10 +1,12 @@
 """
-Predicate Classifier - placeholder for parser imports
+Predicate Classifier
 
-This is a stub implementation. Full implementation will be added in next step.
+Classifies WHERE predicates by the tables they reference as they are added,
+and answers which predicates apply to a subset of tables.
 """
 
-from typing import List, Set, Dict
+from typing import Iterable, List, Set, Dict, FrozenSet, Optional, Tuple
+from sqlglot import exp
 from constants import PredicateSet
 
 
@@ -16,46 +18,83 @@ class PredicateClassifier:
     def __init__(self):
         self.all_predicates: List[str] = []
         self.predicate_tables: Dict[str, Set[str]] = {}  # predicate -> {tables}
+        self.predicate_exprs: Dict[str, exp.Expression] = {}  # predicate -> parsed condition
         self.selections: List[str] = []  # Single-table predicates
         self.joins: List[str] = []  # Two-table predicates
         self.complex: List[str] = []  # Multi-table predicates
+        
+        # Predicates bucketed by arity, maintained by add_predicate.
+        # Selections carry their position in all_predicates so lookups
+        # spanning several tables can restore the original order.
+        self._single_by_table: Dict[str, List[Tuple[int, str]]] = {}
+        self._two_table: List[Tuple[str, FrozenSet[str]]] = []
+        self._multi_table: List[Tuple[str, FrozenSet[str]]] = []
+        self._subset_cache: Dict[FrozenSet[str], PredicateSet] = {}
     
-    def add_predicate(self, predicate: str, tables: Set[str]) -> None:
-        """Add a predicate with its associated tables"""
+    def add_predicate(
+        self,
+        predicate: str,
+        tables: Set[str],
+        expr: Optional[exp.Expression] = None
+    ) -> None:
+        """Add a predicate with its associated tables and, if known, its parsed expression"""
+        position = len(self.all_predicates)
+        frozen = frozenset(tables)
+        
         self.all_predicates.append(predicate)
         self.predicate_tables[predicate] = tables
+        if expr is not None:
+            self.predicate_exprs[predicate] = expr
+        
+        # Classify and bucket by arity; predicates referencing no table are complex
+        if len(frozen) == 1:
+            self.selections.append(predicate)
+            (table,) = frozen
+            self._single_by_table.setdefault(table, []).append((position, predicate))
+        elif len(frozen) == 2:
+            self.joins.append(predicate)
+            self._two_table.append((predicate, frozen))
+        else:
+            self.complex.append(predicate)
+            self._multi_table.append((predicate, frozen))
+        
+        self._subset_cache.clear()
     
-    def classify_predicates(self) -> None:
-        """Classify all predicates into selections, joins, complex"""
-        for predicate in self.all_predicates:
-            tables = self.predicate_tables[predicate]
-            num_tables = len(tables)
-            
-            if num_tables == 1:
-                self.selections.append(predicate)
-            elif num_tables == 2:
-                self.joins.append(predicate)
-            else:
-                self.complex.append(predicate)
-    
-    def get_predicates_for_subset(self, subset: List[str]) -> PredicateSet:
-        """Get predicates applicable to a subset"""
-        subset_set = set(subset)
+    def get_predicates_for_subset(self, subset: Iterable[str]) -> PredicateSet:
+        """
+        Get predicates applicable to a subset
+        
+        Results are memoised per set of tables; the returned PredicateSet
+        is shared between callers, so its fields are tuples.
+        """
+        key = frozenset(subset)
+        cached = self._subset_cache.get(key)
+        if cached is not None:
+            return cached
         
-        selections = []
+        # Selections: direct lookup per table, restored to predicate order
+        if len(key) == 1:
+            (table,) = key
+            selections = tuple(pred for _, pred in self._single_by_table.get(table, ()))
+        else:
+            found = []
+            for table in key:
+                found.extend(self._single_by_table.get(table, ()))
+            found.sort()
+            selections = tuple(pred for _, pred in found)
+        
+        # Joins and complex predicates: only check those that can fit
         joins = []
+        if len(key) >= 2:
+            for pred, pred_tables in self._two_table:
+                if pred_tables <= key:
+                    joins.append(pred)
+        
         complex_preds = []
+        for pred, pred_tables in self._multi_table:
+            if len(pred_tables) <= len(key) and pred_tables <= key:
+                complex_preds.append(pred)
         
-        for predicate in self.all_predicates:
-            pred_tables = self.predicate_tables[predicate]
-            
-            # Include if all tables in predicate are in subset
-            if pred_tables.issubset(subset_set):
-                if len(pred_tables) == 1:
-                    selections.append(predicate)
-                elif len(pred_tables) == 2:
-                    joins.append(predicate)
-                else:
-                    complex_preds.append(predicate)
-        
-        return PredicateSet(selections=selections, joins=joins, complex=complex_preds)
+        result = PredicateSet(selections=selections, joins=tuple(joins), complex=tuple(complex_preds))
+        self._subset_cache[key] = result
+        return result
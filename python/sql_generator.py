@@ -5,8 +5,8 @@ Generates SQL queries for enumerated subsets with proper JOIN syntax
 and complete WHERE clauses.
 """
 
-from typing import Set, List, Optional, Dict
-from constants import JoinPredicate, NextTable, PredicateSet
+from typing import Set, List, Optional, Dict, Tuple
+from constants import BitmaskSubset, NextTable, PredicateSet
 from join_graph import JoinGraph
 from predicates import PredicateClassifier
 
@@ -35,18 +35,19 @@ class SubqueryGenerator:
         self.aliases = aliases
         self.classifier = classifier
         self.join_graph = join_graph
+        self._rendered: Dict[str, str] = {}  # alias -> rendered FROM item
     
     def generate_subquery(
         self, 
-        subset: Set[str], 
-        left: Optional[Set[str]], 
-        right: Optional[Set[str]]
+        subset: Tuple[str, ...], 
+        left: Optional[Tuple[str, ...]], 
+        right: Optional[Tuple[str, ...]]
     ) -> str:
         """
         Generate SQL query for a subset
         
         Args:
-            subset: Set of table aliases
+            subset: Sorted tuple of table aliases
             left: Left subset in decomposition (None for base tables)
             right: Right subset in decomposition (None for base tables)
         
@@ -54,7 +55,7 @@ class SubqueryGenerator:
             SQL query string
         """
         if len(subset) == 1:
-            return self._generate_base_table_query(list(subset)[0])
+            return self._generate_base_table_query(subset[0])
         else:
             return self._generate_join_query(subset, left, right)
     
@@ -82,9 +83,9 @@ class SubqueryGenerator:
     
     def _generate_join_query(
         self, 
-        subset: Set[str], 
-        left: Optional[Set[str]], 
-        right: Optional[Set[str]]
+        subset: Tuple[str, ...], 
+        left: Optional[Tuple[str, ...]], 
+        right: Optional[Tuple[str, ...]]
     ) -> str:
         """
         Generate JOIN query for multiple tables
@@ -92,42 +93,58 @@ class SubqueryGenerator:
         Builds JOIN tree by following original edges when possible.
         
         Args:
-            subset: Full subset of tables
+            subset: Full subset of tables, sorted
             left: Left subset (for metadata only)
             right: Right subset (for metadata only)
         
         Returns:
             SQL query with JOIN syntax
         """
-        subset_list = sorted(subset)
+        subset_list = list(subset)
+        neighbours = self.join_graph.neighbours
         
-        # Build FROM clause with JOINs
+        # Build FROM clause with JOINs, one line per table
         # Start with first table
-        from_clause = self._render_table(subset_list[0])
+        from_parts = [self._render_table(subset_list[0])]
         added_tables = {subset_list[0]}
         remaining_tables = set(subset_list[1:])
         used_join_predicates = set()
         
+        # Remaining tables joined to at least one added table
+        frontier = remaining_tables.intersection(neighbours.get(subset_list[0], ()))
+        
+        # Sorted once; candidates are taken from it in order instead of
+        # re-sorting. Plan subsets already iterate in sorted order
+        if type(subset) is BitmaskSubset:
+            ordered_tables = subset_list
+        else:
+            ordered_tables = sorted(subset_list)
+        
         # Add tables one by one, following original edges
         while remaining_tables:
-            next_info = self._find_next_table_for_join_tree(added_tables, remaining_tables)
+            next_info = self._find_next_table_for_join_tree(
+                added_tables, frontier, ordered_tables
+            )
             
             if not next_info:
                 # Should not happen if subset is connected
                 break
             
-            table = next_info.table
-            join_pred = next_info.join_pred
+            table, join_pred = next_info
             
             # Add JOIN clause
-            from_clause += f"\nJOIN {self._render_table(table)}"
-            
             if join_pred:
-                from_clause += f" ON {join_pred.predicate}"
+                from_parts.append(f"JOIN {self._render_table(table)} ON {join_pred.predicate}")
                 used_join_predicates.add(join_pred.predicate)
+            else:
+                from_parts.append(f"JOIN {self._render_table(table)}")
             
             added_tables.add(table)
             remaining_tables.remove(table)
+            frontier.discard(table)
+            frontier.update(remaining_tables.intersection(neighbours.get(table, ())))
+        
+        from_clause = '\n'.join(from_parts)
         
         # Build WHERE clause with remaining predicates
         where_clause = self._build_where_clause(subset_list, used_join_predicates)
@@ -140,7 +157,8 @@ class SubqueryGenerator:
     def _find_next_table_for_join_tree(
         self, 
         added_tables: Set[str], 
-        remaining_tables: Set[str]
+        frontier: Set[str],
+        ordered_tables: List[str]
     ) -> Optional[NextTable]:
         """
         Find next table to add to JOIN tree
@@ -150,70 +168,35 @@ class SubqueryGenerator:
         
         Args:
             added_tables: Tables already in JOIN tree
-            remaining_tables: Tables not yet added
+            frontier: Tables not yet added that join with an added table
+            ordered_tables: All tables of the subset, sorted
         
         Returns:
             NextTable with table and join predicate, or None if none found
         """
+        neighbours = self.join_graph.neighbours
+        candidates = [table for table in ordered_tables if table in frontier]
+        
         # Try to find table with original join first
-        for table in sorted(remaining_tables):
+        for table in candidates:
+            table_neighbours = neighbours[table]
             for added in added_tables:
-                predicates = self._find_join_predicates([added], [table])
-                
-                # Look for original join
-                for pred in predicates:
-                    if pred.is_original:
-                        return NextTable(table=table, join_pred=pred)
+                # Predicates are ordered original first, so only the head matters
+                predicates = table_neighbours.get(added)
+                if predicates and predicates[0].is_original:
+                    return NextTable(table=table, join_pred=predicates[0])
         
         # Fall back to any join (transitive)
-        for table in sorted(remaining_tables):
+        for table in candidates:
+            table_neighbours = neighbours[table]
             for added in added_tables:
-                predicates = self._find_join_predicates([added], [table])
+                predicates = table_neighbours.get(added)
                 
                 if predicates:
                     return NextTable(table=table, join_pred=predicates[0])
         
         return None
     
-    def _find_join_predicates(
-        self, 
-        left_tables: List[str], 
-        right_tables: List[str]
-    ) -> List[JoinPredicate]:
-        """
-        Find all join predicates between two sets of tables
-        
-        Returns predicates sorted with original joins first.
-        
-        Args:
-            left_tables: Tables on left side
-            right_tables: Tables on right side
-        
-        Returns:
-            List of JoinPredicate objects, original first
-        """
-        predicates = []
-        
-        for l in left_tables:
-            for r in right_tables:
-                # Get edge key
-                edge = '|||'.join(sorted([l, r]))
-                
-                if edge in self.join_graph.join_details:
-                    for detail in self.join_graph.join_details[edge]:
-                        # Format predicate
-                        pred_str = f"{detail.t1}.{detail.t1_col} = {detail.t2}.{detail.t2_col}"
-                        
-                        predicates.append(JoinPredicate(
-                            predicate=pred_str,
-                            is_original=detail.is_original
-                        ))
-        
-        # Sort: original first
-        predicates.sort(key=lambda p: (not p.is_original, p.predicate))
-        
-        return predicates
-    
     def _build_where_clause(
         self, 
         subset: List[str], 
@@ -265,9 +248,15 @@ class SubqueryGenerator:
         Returns:
             "base_table alias" or just "base_table" if no alias
         """
-        base_name = self.aliases.get(alias, alias)
+        rendered = self._rendered.get(alias)
+        if rendered is None:
+            base_name = self.aliases.get(alias, alias)
+            
+            if base_name != alias:
+                rendered = f"{base_name} {alias}"
+            else:
+                rendered = base_name
+            
+            self._rendered[alias] = rendered
         
-        if base_name != alias:
-            return f"{base_name} {alias}"
-        else:
-            return base_name
+        return rendered
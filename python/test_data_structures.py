@@ -4,6 +4,11 @@ Test basic parser data structures
 This tests that the data structures are properly defined and can be instantiated
 """
 
+import sys
+from dataclasses import FrozenInstanceError
+
+import pytest
+
 from constants import (
     JoinDetail,
     TransitiveJoin,
@@ -15,7 +20,9 @@ from constants import (
     JoinPredicate,
     NextTable,
     EnumerationPlan,
-    EnumerationResult
+    EnumerationResult,
+    ParsedSQL,
+    BitmaskSubset
 )
 
 
@@ -31,7 +38,6 @@ def test_join_detail():
     assert jd.t1 == 'a'
     assert jd.t2 == 'b'
     assert jd.is_original is True
-    print("✓ JoinDetail works")
 
 
 def test_transitive_join():
@@ -44,7 +50,6 @@ def test_transitive_join():
     )
     assert tj.t1 == 'a'
     assert tj.t2 == 'c'
-    print("✓ TransitiveJoin works")
 
 
 def test_constant_value():
@@ -57,7 +62,6 @@ def test_constant_value():
     assert cv.table == 't1'
     assert cv.column == 'status'
     assert cv.value == 'active'
-    print("✓ ConstantValue works")
 
 
 def test_constant_equality_join():
@@ -70,7 +74,6 @@ def test_constant_equality_join():
     assert cej.t1 == 't1'
     assert cej.t2 == 't2'
     assert cej.column == 'status'
-    print("✓ ConstantEqualityJoin works")
 
 
 def test_join_condition():
@@ -83,32 +86,29 @@ def test_join_condition():
     )
     assert jc.left_table == 'a'
     assert jc.right_column == 'y'
-    print("✓ JoinCondition works")
 
 
 def test_predicate_set():
     """Test PredicateSet dataclass"""
     ps = PredicateSet(
-        selections=['a.x > 10'],
-        joins=['a.x = b.y'],
-        complex=['a.x + b.y = c.z']
+        selections=('a.x > 10',),
+        joins=('a.x = b.y',),
+        complex=('a.x + b.y = c.z',)
     )
     assert len(ps.selections) == 1
     assert len(ps.joins) == 1
     assert len(ps.complex) == 1
-    print("✓ PredicateSet works")
 
 
 def test_decomposition():
     """Test Decomposition dataclass"""
     decomp = Decomposition(
-        left={'a', 'b'},
-        right={'c'}
+        left=('a', 'b'),
+        right=('c',)
     )
     assert len(decomp.left) == 2
     assert len(decomp.right) == 1
     assert 'a' in decomp.left
-    print("✓ Decomposition works")
 
 
 def test_join_predicate():
@@ -119,7 +119,12 @@ def test_join_predicate():
     )
     assert jp.predicate == 'a.x = b.y'
     assert jp.is_original is True
-    print("✓ JoinPredicate works")
+    
+    # Frozen: hashable and immutable
+    assert jp == JoinPredicate('a.x = b.y', True)
+    assert hash(jp) == hash(JoinPredicate('a.x = b.y', True))
+    with pytest.raises(FrozenInstanceError):
+        jp.is_original = False
 
 
 def test_next_table():
@@ -130,27 +135,48 @@ def test_next_table():
     )
     assert nt.table == 'c'
     assert nt.join_pred.predicate == 'b.y = c.z'
-    print("✓ NextTable works")
 
 
 def test_enumeration_plan():
     """Test EnumerationPlan dataclass"""
     plan = EnumerationPlan(
-        subset={'a', 'b'},
-        left={'a'},
-        right={'b'},
+        subset=('a', 'b'),
+        left=('a',),
+        right=('b',),
         sql='SELECT * FROM a JOIN b ON a.x = b.y;'
     )
     assert len(plan.subset) == 2
     assert 'a' in plan.subset
-    assert plan.left == {'a'}
-    print("✓ EnumerationPlan works")
+    assert plan.left == ('a',)
+
+
+def test_bitmask_subset():
+    """Test BitmaskSubset behaves like its sorted alias tuple"""
+    tables = ['a', 'b', 'c']
+    table_bits = {t: 1 << i for i, t in enumerate(tables)}
+    subset = BitmaskSubset(0b101, tables, table_bits)
+    
+    assert len(subset) == 2
+    assert 'a' in subset and 'b' not in subset and 'z' not in subset
+    
+    # Membership and length never build the tuple
+    assert subset._names is None
+    
+    # Equal only to the same sorted aliases, never to sets or masks
+    assert subset == ('a', 'c')
+    assert subset != {'a', 'c'}
+    assert subset != 0b101
+    assert subset == BitmaskSubset(0b101, tables, table_bits)
+    assert subset != BitmaskSubset(0b011, tables, table_bits)
+    assert subset[0] == 'a'
+    assert list(subset) == ['a', 'c']
+    assert hash(subset) == hash(('a', 'c'))
 
 
 def test_enumeration_result():
     """Test EnumerationResult dataclass"""
-    plan1 = EnumerationPlan({'a'}, None, None, 'SELECT * FROM a;')
-    plan2 = EnumerationPlan({'b'}, None, None, 'SELECT * FROM b;')
+    plan1 = EnumerationPlan(('a',), None, None, 'SELECT * FROM a;')
+    plan2 = EnumerationPlan(('b',), None, None, 'SELECT * FROM b;')
     
     result = EnumerationResult(
         all_plans=[plan1, plan2],
@@ -158,22 +184,25 @@ def test_enumeration_result():
     )
     assert len(result.all_plans) == 2
     assert result.counts[1] == 2
-    print("✓ EnumerationResult works")
+
+
+def test_records_use_slots():
+    """Test that the record dataclasses carry no per-instance __dict__"""
+    records = [
+        JoinDetail('a', 'b', 'x', 'y', True),
+        TransitiveJoin('a', 'b', 'x', 'y'),
+        ConstantValue('a', 'x', 'v'),
+        ConstantEqualityJoin('a', 'b', 'x'),
+        PredicateSet((), (), ()),
+        Decomposition(('a',), ('b',)),
+        JoinPredicate('a.x = b.y', True),
+        EnumerationPlan(('a',), None, None, ''),
+        EnumerationResult([], {}),
+        ParsedSQL(['a'], {}, None, None),
+    ]
+    for record in records:
+        assert not hasattr(record, '__dict__'), type(record).__name__
 
 
 if __name__ == '__main__':
-    print("\nTesting data structures...\n")
-    
-    test_join_detail()
-    test_transitive_join()
-    test_constant_value()
-    test_constant_equality_join()
-    test_join_condition()
-    test_predicate_set()
-    test_decomposition()
-    test_join_predicate()
-    test_next_table()
-    test_enumeration_plan()
-    test_enumeration_result()
-    
-    print("\n✅ All data structure tests passed!\n")
+    sys.exit(pytest.main([__file__]))
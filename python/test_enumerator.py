@@ -4,6 +4,10 @@ Test PostgreSQLJoinEnumerator implementation
 Tests dynamic programming enumeration and ordering
 """
 
+import sys
+
+import pytest
+
 from join_graph import JoinGraph
 from enumerator import PostgreSQLJoinEnumerator
 
@@ -19,9 +23,7 @@ def test_enumerate_single_table():
     # Should have 1 subset at level 1
     assert len(result.all_plans) == 1
     assert result.counts[1] == 1
-    assert result.all_plans[0].subset == {'a'}
-    
-    print("✓ enumerate single table works")
+    assert result.all_plans[0].subset == ('a',)
 
 
 def test_enumerate_disconnected_tables():
@@ -36,8 +38,23 @@ def test_enumerate_disconnected_tables():
     assert len(result.all_plans) == 2
     assert result.counts[1] == 2
     assert result.counts.get(2, 0) == 0  # No level-2 subsets
+    assert list(result.counts) == [1, 2]  # Empty levels are still reported
+
+
+def test_enumerate_stops_at_largest_component():
+    """Test that levels above the largest component are skipped"""
+    jg = JoinGraph()
+    jg.add_join('a', 'b', 'x', 'x', is_original=True)
+    jg.add_join('c', 'd', 'y', 'y', is_original=True)
+    jg.add_join('d', 'e', 'y', 'y', is_original=True)
+    jg.build_equivalence_classes()
+    
+    enum = PostgreSQLJoinEnumerator(jg)
+    result = enum.enumerate_subsets(['a', 'b', 'c', 'd', 'e'])
     
-    print("✓ enumerate disconnected tables works")
+    assert enum._largest_component_size() == 3
+    assert result.counts == {1: 5, 2: 4, 3: 1, 4: 0, 5: 0}
+    assert result.all_plans[-1].subset == ('c', 'd', 'e')
 
 
 def test_enumerate_simple_join():
@@ -56,22 +73,14 @@ def test_enumerate_simple_join():
     
     # Check level-2 subset
     level2 = [p for p in result.all_plans if len(p.subset) == 2][0]
-    assert level2.subset == {'a', 'b'}
-    assert level2.left == {'a'}
-    assert level2.right == {'b'}
-    
-    print("✓ enumerate simple join works")
+    assert level2.subset == ('a', 'b')
+    assert level2.left == ('a',)
+    assert level2.right == ('b',)
 
 
-def test_enumerate_chain():
+def test_enumerate_chain(chain_graph):
     """Test enumeration with chain: A-B-C"""
-    jg = JoinGraph()
-    jg.add_join('a', 'b', 'x', 'y', is_original=True)
-    jg.add_join('b', 'c', 'y', 'z', is_original=True)
-    jg.compute_transitive_closure()  # Adds a-c
-    jg.build_equivalence_classes()
-    
-    enum = PostgreSQLJoinEnumerator(jg)
+    enum = PostgreSQLJoinEnumerator(chain_graph(3))  # Closure adds a-c
     result = enum.enumerate_subsets(['a', 'b', 'c'])
     
     # Level 1: {a}, {b}, {c}
@@ -85,20 +94,32 @@ def test_enumerate_chain():
     
     # Total: 3 + 3 + 1 = 7
     assert len(result.all_plans) == 7
-    
-    print("✓ enumerate chain works")
 
 
-def test_enumerate_star():
-    """Test enumeration with star: center connected to s1, s2, s3"""
+def test_enumerate_chain_distinct_columns():
+    """Test chain A-B-C on different columns: {a, c} is not connected"""
     jg = JoinGraph()
-    jg.add_join('center', 's1', 'id', 'cid', is_original=True)
-    jg.add_join('center', 's2', 'id', 'cid', is_original=True)
-    jg.add_join('center', 's3', 'id', 'cid', is_original=True)
-    jg.compute_transitive_closure()  # Adds s1-s2, s1-s3, s2-s3
+    jg.add_join('a', 'b', 'x', 'y', is_original=True)
+    jg.add_join('b', 'c', 'z', 'w', is_original=True)
+    jg.compute_transitive_closure()  # Adds nothing (columns differ on b)
     jg.build_equivalence_classes()
     
     enum = PostgreSQLJoinEnumerator(jg)
+    result = enum.enumerate_subsets(['a', 'b', 'c'])
+    
+    # Level 2: {a,b}, {b,c} only
+    assert result.counts[2] == 2
+    subsets_l2 = [p.subset for p in result.all_plans[3:5]]
+    assert subsets_l2 == [('a', 'b'), ('b', 'c')]
+    
+    # Level 3: {a,b,c} is still reachable through b
+    assert result.counts[3] == 1
+    assert result.all_plans[5].subset == ('a', 'b', 'c')
+
+
+def test_enumerate_star(star_graph):
+    """Test enumeration with star: center connected to s1, s2, s3"""
+    enum = PostgreSQLJoinEnumerator(star_graph(3))  # Closure adds s1-s2, s1-s3, s2-s3
     result = enum.enumerate_subsets(['center', 's1', 's2', 's3'])
     
     # Level 1: 4 tables
@@ -107,19 +128,11 @@ def test_enumerate_star():
     # Level 2: All pairs should be connected (via transitive closure)
     # {center,s1}, {center,s2}, {center,s3}, {s1,s2}, {s1,s3}, {s2,s3}
     assert result.counts[2] == 6
-    
-    print("✓ enumerate star works")
 
 
-def test_enumerate_ordering():
+def test_enumerate_ordering(chain_graph):
     """Test that enumeration maintains correct ordering"""
-    jg = JoinGraph()
-    jg.add_join('a', 'b', 'x', 'y', is_original=True)
-    jg.add_join('b', 'c', 'y', 'z', is_original=True)
-    jg.compute_transitive_closure()
-    jg.build_equivalence_classes()
-    
-    enum = PostgreSQLJoinEnumerator(jg)
+    enum = PostgreSQLJoinEnumerator(chain_graph(3))
     result = enum.enumerate_subsets(['a', 'b', 'c'])
     
     # Check order: level 1, then level 2, then level 3
@@ -127,34 +140,25 @@ def test_enumerate_ordering():
     
     # Level 1 subsets
     level1 = result.all_plans[0:3]
-    assert level1[0].subset == {'a'}
-    assert level1[1].subset == {'b'}
-    assert level1[2].subset == {'c'}
+    assert level1[0].subset == ('a',)
+    assert level1[1].subset == ('b',)
+    assert level1[2].subset == ('c',)
     
     # Level 2 subsets (sorted)
     level2 = result.all_plans[3:6]
     subsets_l2 = [p.subset for p in level2]
-    assert {'a', 'b'} in subsets_l2
-    assert {'a', 'c'} in subsets_l2
-    assert {'b', 'c'} in subsets_l2
+    assert ('a', 'b') in subsets_l2
+    assert ('a', 'c') in subsets_l2
+    assert ('b', 'c') in subsets_l2
     
     # Level 3 subset
     level3 = result.all_plans[6]
-    assert level3.subset == {'a', 'b', 'c'}
-    
-    print("✓ enumerate ordering works")
+    assert level3.subset == ('a', 'b', 'c')
 
 
-def test_enumerate_max_level():
+def test_enumerate_max_level(chain_graph):
     """Test that max_level limits enumeration"""
-    jg = JoinGraph()
-    jg.add_join('a', 'b', 'x', 'y', is_original=True)
-    jg.add_join('b', 'c', 'y', 'z', is_original=True)
-    jg.add_join('c', 'd', 'z', 'w', is_original=True)
-    jg.compute_transitive_closure()
-    jg.build_equivalence_classes()
-    
-    enum = PostgreSQLJoinEnumerator(jg)
+    enum = PostgreSQLJoinEnumerator(chain_graph(4))
     result = enum.enumerate_subsets(['a', 'b', 'c', 'd'], max_level=2)
     
     # Should only enumerate up to level 2
@@ -164,8 +168,59 @@ def test_enumerate_max_level():
     # Should have level 1 and 2
     assert 1 in result.counts
     assert 2 in result.counts
+
+
+def test_enumerate_idp_matches_exact_within_window():
+    """Test that IDP with all tables in one window is the exact enumeration"""
+    jg = JoinGraph()
+    jg.add_join('a', 'b', 'x', 'x', is_original=True)
+    jg.add_join('b', 'c', 'y', 'y', is_original=True)
+    jg.add_join('c', 'd', 'z', 'z', is_original=True)
+    jg.add_join('a', 'd', 'w', 'w', is_original=True)
+    jg.build_equivalence_classes()
+    tables = ['a', 'b', 'c', 'd', 'e']
+    
+    exact = PostgreSQLJoinEnumerator(jg).enumerate_subsets(tables)
+    idp = PostgreSQLJoinEnumerator(jg).enumerate_subsets(tables, strategy='idp', idp_window=5)
     
-    print("✓ enumerate max_level works")
+    assert [p.subset for p in idp.all_plans] == [p.subset for p in exact.all_plans]
+    assert [p.left for p in idp.all_plans] == [p.left for p in exact.all_plans]
+    assert idp.counts == exact.counts
+
+
+def test_enumerate_idp_wide_chain():
+    """Test IDP on a chain too wide for exhaustive enumeration"""
+    tables = [f't{i:02}' for i in range(40)]
+    jg = JoinGraph()
+    for i in range(len(tables) - 1):
+        jg.add_join(tables[i], tables[i + 1], f'c{i}', f'c{i}', is_original=True)
+    jg.build_equivalence_classes()
+    
+    enum = PostgreSQLJoinEnumerator(jg)
+    result = enum.enumerate_idp(tables, k=4, max_level=40)
+    
+    # Base tables first, then joins whose sides were emitted earlier
+    assert [p.subset for p in result.all_plans[:40]] == [(t,) for t in tables]
+    seen = set()
+    for plan in result.all_plans:
+        assert plan.subset.mask not in seen
+        if plan.left is not None:
+            assert plan.left.mask in seen and plan.right.mask in seen
+            assert plan.left.mask ^ plan.right.mask == plan.subset.mask
+        seen.add(plan.subset.mask)
+    
+    # The whole chain is reached, without enumerating all 780 connected subsets
+    assert result.all_plans[-1].subset == tuple(tables)
+    assert len(result.all_plans) < 200
+    assert sum(result.counts.values()) == len(result.all_plans)
+
+
+def test_enumerate_unknown_strategy():
+    """Test that an unknown strategy is rejected"""
+    enum = PostgreSQLJoinEnumerator(JoinGraph())
+    
+    with pytest.raises(ValueError, match='strategy'):
+        enum.enumerate_subsets(['a'], strategy='geqo')
 
 
 def test_find_decomposition():
@@ -183,9 +238,46 @@ def test_find_decomposition():
     # Should have decomposition
     assert level2_plan.left is not None
     assert level2_plan.right is not None
-    assert level2_plan.left | level2_plan.right == {'a', 'b'}
+    assert level2_plan.left.mask ^ level2_plan.right.mask == level2_plan.subset.mask
+    assert level2_plan.subset == ('a', 'b')
+
+
+def test_decompositions_partition_subset():
+    """Test that every plan's sides are disjoint and cover the subset"""
+    jg = JoinGraph()
+    jg.add_join('a', 'b', 'x', 'x', is_original=True)
+    jg.add_join('b', 'c', 'y', 'y', is_original=True)
+    jg.add_join('c', 'd', 'z', 'z', is_original=True)
+    jg.add_join('d', 'a', 'w', 'w', is_original=True)
+    jg.add_join('a', 'e', 'v', 'v', is_original=True)
+    jg.build_equivalence_classes()
+    
+    enum = PostgreSQLJoinEnumerator(jg)
+    result = enum.enumerate_subsets(['a', 'b', 'c', 'd', 'e'])
+    
+    for plan in result.all_plans:
+        if plan.left is None:
+            assert len(plan.subset) == 1
+            continue
+        # Disjoint sides: XOR equals OR, so one XOR checks the cover
+        assert plan.left.mask & plan.right.mask == 0
+        assert plan.left.mask ^ plan.right.mask == plan.subset.mask
+
+
+def test_decomposition_peels_first_non_cut_table():
+    """Test that the left side is the first table whose removal keeps the rest connected"""
+    # Chain: b - a - c (a is a cut vertex)
+    jg = JoinGraph()
+    jg.add_join('a', 'b', 'x', 'y', is_original=True)
+    jg.add_join('a', 'c', 'z', 'w', is_original=True)
+    jg.build_equivalence_classes()
     
-    print("✓ find_decomposition works")
+    enum = PostgreSQLJoinEnumerator(jg)
+    result = enum.enumerate_subsets(['a', 'b', 'c'])
+    
+    level3 = next(p for p in result.all_plans if len(p.subset) == 3)
+    assert level3.left == ('b',)
+    assert level3.right == ('a', 'c')
 
 
 def test_enumerate_constant_equality():
@@ -203,22 +295,8 @@ def test_enumerate_constant_equality():
     assert result.counts[2] == 1
     
     level2 = [p for p in result.all_plans if len(p.subset) == 2][0]
-    assert level2.subset == {'t1', 't2'}
-    
-    print("✓ enumerate constant_equality works")
+    assert level2.subset == ('t1', 't2')
 
 
 if __name__ == '__main__':
-    print("\nTesting PostgreSQLJoinEnumerator...\n")
-    
-    test_enumerate_single_table()
-    test_enumerate_disconnected_tables()
-    test_enumerate_simple_join()
-    test_enumerate_chain()
-    test_enumerate_star()
-    test_enumerate_ordering()
-    test_enumerate_max_level()
-    test_find_decomposition()
-    test_enumerate_constant_equality()
-    
-    print("\n✅ All enumerator tests passed!\n")
+    sys.exit(pytest.main([__file__]))
@@ -4,10 +4,15 @@ Integration tests for complete enumeration pipeline
 Tests end-to-end flow from SQL parsing to enumeration to SQL generation
 """
 
+import sys
+
+import pytest
+
 from parser import parse_sql
 from enumerator import PostgreSQLJoinEnumerator
 from sql_generator import SubqueryGenerator
-from utils import format_subset
+from utils import format_subset, order_join_predicates
+from constants import JoinPredicate
 
 
 def test_simple_join_pipeline():
@@ -35,8 +40,6 @@ def test_simple_join_pipeline():
         sql_query = generator.generate_subquery(plan.subset, plan.left, plan.right)
         assert sql_query.strip().startswith("SELECT")
         assert sql_query.strip().endswith(";")
-    
-    print("✓ simple join pipeline works")
 
 
 def test_chain_join_pipeline():
@@ -72,10 +75,8 @@ def test_chain_join_pipeline():
         assert "SELECT" in sql_query
         
         # Check that selection predicate appears in single-table query
-        if plan.subset == {'A'}:
+        if plan.subset == ('A',):
             assert "A.w > 5" in sql_query or "w > 5" in sql_query
-    
-    print("✓ chain join pipeline works")
 
 
 def test_constant_equality_pipeline():
@@ -109,8 +110,6 @@ def test_constant_equality_pipeline():
     # Should have JOIN with it1.info = it2.info
     assert "JOIN" in sql_query
     assert "it1.info = it2.info" in sql_query
-    
-    print("✓ constant equality pipeline works")
 
 
 def test_modern_join_syntax():
@@ -132,8 +131,6 @@ def test_modern_join_syntax():
     
     # Should enumerate all subsets
     assert len(result.all_plans) == 7
-    
-    print("✓ modern JOIN syntax pipeline works")
 
 
 def test_self_join_pipeline():
@@ -166,8 +163,6 @@ def test_self_join_pipeline():
     # Should have proper aliasing
     assert "users u1" in sql_query
     assert "users u2" in sql_query
-    
-    print("✓ self-join pipeline works")
 
 
 def test_disconnected_tables():
@@ -189,8 +184,6 @@ def test_disconnected_tables():
     assert result.counts[1] == 2
     assert result.counts.get(2, 0) == 0
     assert len(result.all_plans) == 2
-    
-    print("✓ disconnected tables pipeline works")
 
 
 def test_in_operator_constant_equality():
@@ -210,8 +203,6 @@ def test_in_operator_constant_equality():
     
     # Should enumerate {kt1, kt2}
     assert result.counts[2] == 1
-    
-    print("✓ IN operator constant equality works")
 
 
 def test_in_operator_multiple_values_no_join():
@@ -231,8 +222,6 @@ def test_in_operator_multiple_values_no_join():
     
     # Should NOT enumerate {A, B} (multiple values in IN)
     assert result.counts.get(2, 0) == 0
-    
-    print("✓ IN operator multiple values correctly rejected")
 
 
 def test_subset_formatting():
@@ -242,8 +231,101 @@ def test_subset_formatting():
     
     # Should be sorted
     assert formatted == '{a, b, c}'
+
+
+def test_join_predicate_ordering():
+    """Test join predicates are ordered original first, then by text"""
+    preds = [
+        JoinPredicate(predicate='b.y = c.y', is_original=False),
+        JoinPredicate(predicate='b.x = c.x', is_original=True),
+        JoinPredicate(predicate='a.x = c.x', is_original=False),
+        JoinPredicate(predicate='a.y = c.y', is_original=True),
+    ]
+    
+    ordered = [p.predicate for p in order_join_predicates(preds)]
+    assert ordered == ['a.y = c.y', 'b.x = c.x', 'a.x = c.x', 'b.y = c.y']
+
+
+def test_parse_sql_cached():
+    """Test that repeated parses of the same SQL are served from cache"""
+    sql = "SELECT * FROM A, B WHERE A.x = B.y;"
+    
+    parse_sql.cache_clear()
+    first = parse_sql(sql)
+    second = parse_sql(sql)
+    
+    # Same SQL and dialect: same (shared) result object
+    assert first is second
+    assert parse_sql.cache_info().hits == 1
+    
+    # Different dialect is a different cache entry
+    assert parse_sql(sql, 'mysql') is not first
+
+
+def test_parse_sql_cached_result_unchanged_by_processing():
+    """Test that processing a cached ParsedSQL leaves it as a fresh parse"""
+    sql = """
+    SELECT * FROM A, B, C, D
+    WHERE A.x = B.x AND B.x = C.x AND C.y = D.y
+      AND A.k = 5 AND D.k = 5 AND A.z > 1 AND B.w + D.w > 2;
+    """
     
-    print("✓ subset formatting works")
+    def snapshot(parsed):
+        jg = parsed.join_graph
+        return (
+            list(parsed.tables),
+            dict(parsed.aliases),
+            set(jg.edges),
+            {edge: list(details) for edge, details in jg.join_details.items()},
+            list(parsed.classifier.all_predicates),
+        )
+    
+    def process(parsed):
+        enumerator = PostgreSQLJoinEnumerator(parsed.join_graph)
+        result = enumerator.enumerate_subsets(parsed.tables)
+        generator = SubqueryGenerator(parsed.aliases, parsed.classifier, parsed.join_graph)
+        return [
+            (format_subset(plan.subset), generator.generate_subquery(plan.subset, plan.left, plan.right))
+            for plan in result.all_plans
+        ]
+    
+    parse_sql.cache_clear()
+    cached = parse_sql(sql)
+    before = snapshot(cached)
+    rows = process(cached)
+    
+    # The second parse is served from cache, after downstream processing
+    again = parse_sql(sql)
+    assert again is cached
+    assert snapshot(again) == before
+    assert process(again) == rows
+    
+    # Same state and output as an uncached parse
+    parse_sql.cache_clear()
+    fresh = parse_sql(sql)
+    assert fresh is not cached
+    assert snapshot(fresh) == before
+    assert process(fresh) == rows
+
+
+def test_parse_sql_cache_keeps_quoted_whitespace():
+    """Test that the cache is keyed on the exact SQL, quoted whitespace included"""
+    parse_sql.cache_clear()
+    base = "SELECT * FROM A, B WHERE A.x = B.y AND A.z = "
+    
+    # Dollar-quoted strings
+    wide = parse_sql(base + "$$p   q$$;")
+    narrow = parse_sql(base + "$$p q$$;")
+    assert wide is not narrow
+    assert wide.classifier.get_predicates_for_subset(['A']).selections == ("A.z = 'p   q'",)
+    assert narrow.classifier.get_predicates_for_subset(['A']).selections == ("A.z = 'p q'",)
+    
+    # E-strings, with an escaped quote
+    assert parse_sql(base + "E'it\\'s   x';") is not parse_sql(base + "E'it\\'s x';")
+    
+    # Layout is part of the key too
+    assert parse_sql(base + "'p';") is not parse_sql(base + "\n'p';")
+    assert parse_sql.cache_info().misses == 6
 
 
 def test_max_level_limit():
@@ -267,22 +349,7 @@ def test_max_level_limit():
     assert 2 in result.counts
     assert 3 not in result.counts
     assert 4 not in result.counts
-    
-    print("✓ max_level limit works")
 
 
 if __name__ == '__main__':
-    print("\nRunning integration tests...\n")
-    
-    test_simple_join_pipeline()
-    test_chain_join_pipeline()
-    test_constant_equality_pipeline()
-    test_modern_join_syntax()
-    test_self_join_pipeline()
-    test_disconnected_tables()
-    test_in_operator_constant_equality()
-    test_in_operator_multiple_values_no_join()
-    test_subset_formatting()
-    test_max_level_limit()
-    
-    print("\n✅ All integration tests passed!\n")
+    sys.exit(pytest.main([__file__]))
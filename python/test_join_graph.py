@@ -4,6 +4,10 @@ Test JoinGraph implementation
 Tests equivalence class construction, transitive closure, and connectivity
 """
 
+import sys
+
+import pytest
+
 from join_graph import JoinGraph
 
 
@@ -13,16 +17,14 @@ def test_add_join_basic():
     jg.add_join('a', 'b', 'x', 'y', is_original=True)
     
     # Check edge was added (normalized)
-    assert 'a|||b' in jg.edges
+    assert frozenset(('a', 'b')) in jg.edges
     
     # Check details were stored
-    assert 'a|||b' in jg.join_details
-    assert len(jg.join_details['a|||b']) == 1
+    assert frozenset(('a', 'b')) in jg.join_details
+    assert len(jg.join_details[frozenset(('a', 'b'))]) == 1
     
-    detail = jg.join_details['a|||b'][0]
+    detail = jg.join_details[frozenset(('a', 'b'))][0]
     assert detail.is_original is True
-    
-    print("✓ add_join basic works")
 
 
 def test_add_join_normalization():
@@ -32,11 +34,9 @@ def test_add_join_normalization():
     # Add in different orders
     jg.add_join('b', 'a', 'y', 'x', is_original=True)
     
-    # Should normalize to a|||b
-    assert 'a|||b' in jg.edges
-    assert 'b|||a' not in jg.edges  # Reverse should not exist
-    
-    print("✓ add_join normalization works")
+    # Should normalize to a single {a, b} edge
+    assert frozenset(('a', 'b')) in jg.edges
+    assert len(jg.edges) == 1  # Reverse maps to the same key
 
 
 def test_build_equivalence_classes_simple():
@@ -55,8 +55,6 @@ def test_build_equivalence_classes_simple():
     assert 'a.x' in ec
     assert 'b.y' in ec
     assert 'c.z' in ec
-    
-    print("✓ build_equivalence_classes simple works")
 
 
 def test_build_equivalence_classes_multiple():
@@ -81,16 +79,11 @@ def test_build_equivalence_classes_multiple():
     
     assert 'a.x' in ec1 and 'b.y' in ec1
     assert 'c.z' in ec2 and 'd.w' in ec2
-    
-    print("✓ build_equivalence_classes multiple works")
 
 
-def test_are_in_same_ec():
+def test_are_in_same_ec(chain_graph):
     """Test checking if tables share an EC"""
-    jg = JoinGraph()
-    jg.add_join('a', 'b', 'x', 'y', is_original=True)
-    jg.add_join('b', 'c', 'y', 'z', is_original=True)
-    jg.build_equivalence_classes()
+    jg = chain_graph(3)  # a.x = b.y, b.y = c.z
     
     # a and b share EC
     assert jg.are_in_same_ec('a', 'b') is True
@@ -100,8 +93,6 @@ def test_are_in_same_ec():
     
     # b and c share EC
     assert jg.are_in_same_ec('b', 'c') is True
-    
-    print("✓ are_in_same_ec works")
 
 
 def test_are_in_same_ec_negative():
@@ -113,24 +104,51 @@ def test_are_in_same_ec_negative():
     # c is not connected
     assert jg.are_in_same_ec('a', 'c') is False
     assert jg.are_in_same_ec('b', 'c') is False
-    
-    print("✓ are_in_same_ec negative works")
 
 
-def test_is_connected_simple():
-    """Test connectivity check for simple chain"""
+def test_table_to_ecs_rebuilt():
+    """Test that the table->EC index is rebuilt with the ECs"""
     jg = JoinGraph()
     jg.add_join('a', 'b', 'x', 'y', is_original=True)
-    jg.add_join('b', 'c', 'y', 'z', is_original=True)
     jg.build_equivalence_classes()
     
+    assert jg.are_in_same_ec('a', 'c') is False
+    
+    # New join after first build: index must pick it up on rebuild
+    jg.add_join('a', 'c', 'x', 'z', is_original=True)
+    jg.build_equivalence_classes()
+    
+    assert jg.table_to_ecs['a'] == jg.table_to_ecs['c']
+    assert jg.are_in_same_ec('a', 'c') is True
+
+
+def test_build_equivalence_classes_short_circuit():
+    """Test that rebuilding without new joins keeps the existing ECs"""
+    jg = JoinGraph()
+    jg.add_join('a', 'b', 'x', 'y', is_original=True)
+    assert jg.build_equivalence_classes() == 1
+    
+    # No new joins: same objects are kept
+    ecs = jg.equivalence_classes
+    assert jg.build_equivalence_classes() == 1
+    assert jg.equivalence_classes is ecs
+    
+    # Union-Find is already current before the rebuild
+    jg.add_join('c', 'd', 'z', 'w', is_original=True)
+    assert len(jg._column_components()[1]) == 2
+    assert jg.build_equivalence_classes() == 2
+    assert jg.equivalence_classes is not ecs
+
+
+def test_is_connected_simple(chain_graph):
+    """Test connectivity check for simple chain"""
+    jg = chain_graph(3)  # a.x = b.y, b.y = c.z
+    
     # All connected
     assert jg.is_connected({'a', 'b', 'c'}) is True
     assert jg.is_connected({'a', 'b'}) is True
     assert jg.is_connected({'b', 'c'}) is True
     assert jg.is_connected({'a', 'c'}) is True
-    
-    print("✓ is_connected simple works")
 
 
 def test_is_connected_disconnected():
@@ -142,17 +160,29 @@ def test_is_connected_disconnected():
     # c is not connected to a-b chain
     assert jg.is_connected({'a', 'b', 'c'}) is False
     assert jg.is_connected({'a', 'c'}) is False
-    
-    print("✓ is_connected disconnected works")
 
 
-def test_can_join():
-    """Test checking if two subsets can join"""
+def test_is_connected_cache_rebuilt():
+    """Test that cached connectivity is dropped when ECs are rebuilt"""
     jg = JoinGraph()
     jg.add_join('a', 'b', 'x', 'y', is_original=True)
+    jg.add_join('c', 'd', 'z', 'w', is_original=True)
+    jg.build_equivalence_classes()
+    
+    assert jg.is_connected({'a', 'b', 'c', 'd'}) is False
+    assert jg.is_connected({'a', 'b', 'c', 'd'}) is False  # Served from cache
+    
+    # Linking the two pairs must invalidate the cached answer
     jg.add_join('b', 'c', 'y', 'z', is_original=True)
     jg.build_equivalence_classes()
     
+    assert jg.is_connected({'a', 'b', 'c', 'd'}) is True
+
+
+def test_can_join(chain_graph):
+    """Test checking if two subsets can join"""
+    jg = chain_graph(3)  # a.x = b.y, b.y = c.z
+    
     # {a} can join with {b}
     assert jg.can_join({'a'}, {'b'}) is True
     
@@ -161,8 +191,22 @@ def test_can_join():
     
     # {a} can join with {c} (transitively)
     assert jg.can_join({'a'}, {'c'}) is True
+
+
+def test_ec_mask():
+    """Test EC bitmasks used by can_join"""
+    jg = JoinGraph()
+    jg.add_join('a', 'b', 'x', 'y', is_original=True)
+    jg.add_join('c', 'd', 'z', 'w', is_original=True)
+    jg.build_equivalence_classes()
     
-    print("✓ can_join works")
+    # Each pair sits in its own EC
+    assert jg.ec_mask({'a'}) == jg.ec_mask({'b'})
+    assert jg.ec_mask({'a'}) & jg.ec_mask({'c'}) == 0
+    assert jg.ec_mask({'e'}) == 0
+    
+    assert jg.can_join({'a', 'c'}, {'d'}) is True
+    assert jg.can_join({'a'}, {'c', 'd'}) is False
 
 
 def test_compute_transitive_closure():
@@ -178,14 +222,12 @@ def test_compute_transitive_closure():
     assert added >= 1
     
     # Check that a-c edge exists
-    edge_ac = 'a|||c'
+    edge_ac = frozenset(('a', 'c'))
     assert edge_ac in jg.join_details
     
     # Check it's marked as transitive
     detail = jg.join_details[edge_ac][0]
     assert detail.is_original is False
-    
-    print("✓ compute_transitive_closure works")
 
 
 def test_transitive_closure_column_aware():
@@ -200,9 +242,7 @@ def test_transitive_closure_column_aware():
     
     # Should add transitive join
     assert added >= 1
-    assert 'a|||c' in jg.join_details
-    
-    print("✓ transitive_closure column-aware works")
+    assert frozenset(('a', 'c')) in jg.join_details
 
 
 def test_transitive_closure_no_match():
@@ -217,9 +257,23 @@ def test_transitive_closure_no_match():
     
     # Should NOT add a-c join (columns don't match on B)
     assert added == 0
-    assert 'a|||c' not in jg.join_details
+    assert frozenset(('a', 'c')) not in jg.join_details
+
+
+def test_transitive_closure_through_same_table_columns():
+    """Test closure follows equalities that pass through one table twice"""
+    jg = JoinGraph()
     
-    print("✓ transitive_closure rejects non-matching columns")
+    # a.x = b.z AND b.z = a.y AND a.y = b.y => a.x = b.y
+    jg.add_join('a', 'b', 'x', 'z', is_original=True)
+    jg.add_join('b', 'a', 'z', 'y', is_original=True)
+    jg.add_join('a', 'b', 'y', 'y', is_original=True)
+    
+    added = jg.compute_transitive_closure()
+    
+    assert added == 1
+    new = [d for d in jg.join_details[frozenset(('a', 'b'))] if not d.is_original]
+    assert [(d.t1, d.t1_col, d.t2, d.t2_col) for d in new] == [('a', 'x', 'b', 'y')]
 
 
 def test_self_join_not_connected():
@@ -234,8 +288,6 @@ def test_self_join_not_connected():
     
     # Should NOT be connected (no join condition)
     assert jg.is_connected({'t1', 't2'}) is False
-    
-    print("✓ self_join without condition not connected")
 
 
 def test_self_join_with_condition():
@@ -251,26 +303,32 @@ def test_self_join_with_condition():
     
     # Should be connected (explicit join)
     assert jg.is_connected({'t1', 't2'}) is True
+
+
+def test_neighbours(chain_graph):
+    """Test neighbour index lists join predicates per table pair"""
+    jg = chain_graph(3)  # a.x = b.y, b.y = c.z; closure adds a.x = c.z
+    
+    assert set(jg.neighbours['b']) == {'a', 'c'}
+    assert jg.neighbours['a']['b'] is jg.neighbours['b']['a']
+    
+    preds = jg.neighbours['c']['a']
+    assert [p.predicate for p in preds] == ['a.x = c.z']
+    assert preds[0].is_original is False
+
+
+def test_neighbours_follow_add_join():
+    """Test neighbours is built on demand and rebuilt after add_join"""
+    jg = JoinGraph()
+    jg.add_join('a', 'b', 'x', 'x', is_original=True)
+    
+    # No build_equivalence_classes() needed
+    assert set(jg.neighbours['a']) == {'b'}
     
-    print("✓ self_join with condition is connected")
+    jg.add_join('b', 'c', 'y', 'y', is_original=True)
+    assert set(jg.neighbours['b']) == {'a', 'c'}
+    assert [p.predicate for p in jg.neighbours['c']['b']] == ['b.y = c.y']
 
 
 if __name__ == '__main__':
-    print("\nTesting JoinGraph...\n")
-    
-    test_add_join_basic()
-    test_add_join_normalization()
-    test_build_equivalence_classes_simple()
-    test_build_equivalence_classes_multiple()
-    test_are_in_same_ec()
-    test_are_in_same_ec_negative()
-    test_is_connected_simple()
-    test_is_connected_disconnected()
-    test_can_join()
-    test_compute_transitive_closure()
-    test_transitive_closure_column_aware()
-    test_transitive_closure_no_match()
-    test_self_join_not_connected()
-    test_self_join_with_condition()
-    
-    print("\n✅ All JoinGraph tests passed!\n")
+    sys.exit(pytest.main([__file__]))
@@ -5,104 +5,96 @@ Tests the query extraction and constant-value detection functions
 """
 
 import re
+import sys
+
+import pytest
+
 from parser import (
-    _normalize_value,
-    _extract_single_constant_value
+    _extract_predicates_from_where,
+    _split_where_conditions,
+    _constant_value_from_expression
 )
+from sqlglot import parse_one
 from predicates import PredicateClassifier
 
 
-def test_normalize_value():
-    """Test value normalization"""
-    # Single quotes
-    assert _normalize_value("'active'") == 'active'
-    
-    # Double quotes
-    assert _normalize_value('"active"') == 'active'
-    
-    # With type cast
-    assert _normalize_value("'2024-01-01'::timestamp") == '2024-01-01'
-    
-    # Number
-    assert _normalize_value('123') == '123'
-    
-    # With whitespace
-    assert _normalize_value("  'value'  ") == 'value'
-    
-    print("✓ _normalize_value works")
+def _constant(predicate):
+    """Extract a constant value from predicate text via its parsed expression"""
+    return _constant_value_from_expression(parse_one(predicate, dialect='postgres'))
 
 
-def test_extract_single_constant_value_equality():
+def test_constant_value_equality():
     """Test extracting constant value from = predicates"""
     # Simple equality
-    result = _extract_single_constant_value("t1.status = 'active'")
+    result = _constant("t1.status = 'active'")
     assert result is not None
     assert result.table == 't1'
     assert result.column == 'status'
     assert result.value == 'active'
     
     # With type cast
-    result = _extract_single_constant_value("t2.date = '2024-01-01'::timestamp")
+    result = _constant("t2.date = '2024-01-01'::timestamp")
     assert result is not None
     assert result.table == 't2'
     assert result.value == '2024-01-01'
     
-    # Number
-    result = _extract_single_constant_value("t3.id = 123")
-    assert result is not None
-    assert result.value == '123'
-    
-    print("✓ Extract single constant from = works")
+    # Number, negated number
+    assert _constant("t3.id = 123").value == '123'
+    assert _constant("t1.n = -3").value == '-3'
 
 
-def test_extract_single_constant_value_in_single():
+def test_constant_value_in_single():
     """Test extracting constant value from IN with single value"""
     # Single value in IN
-    result = _extract_single_constant_value("t1.kind IN ('tv series')")
+    result = _constant("t1.kind IN ('tv series')")
     assert result is not None
     assert result.table == 't1'
     assert result.column == 'kind'
     assert result.value == 'tv series'
     
     # Single value with spaces
-    result = _extract_single_constant_value("t2.status IN ( 'active' )")
-    assert result is not None
-    assert result.value == 'active'
-    
-    print("✓ Extract single constant from IN (single value) works")
+    assert _constant("t2.status IN ( 'active' )").value == 'active'
+    assert _constant("t1.id IN (42)").value == '42'
 
 
-def test_extract_single_constant_value_in_multiple():
-    """Test that IN with multiple values returns None"""
-    # Multiple values - should return None
-    result = _extract_single_constant_value("t1.status IN ('active', 'pending')")
-    assert result is None
-    
-    result = _extract_single_constant_value("t2.type IN ('a', 'b', 'c')")
-    assert result is None
-    
-    print("✓ Extract rejects IN with multiple values")
+def test_constant_value_in_multiple():
+    """Test that IN with multiple values or a subquery returns None"""
+    assert _constant("t1.status IN ('active', 'pending')") is None
+    assert _constant("t2.type IN ('a', 'b', 'c')") is None
+    assert _constant("t1.x IN (SELECT y FROM z)") is None
 
 
-def test_extract_single_constant_value_invalid():
-    """Test that non-equality predicates return None"""
-    # Greater than
-    result = _extract_single_constant_value("t1.value > 10")
-    assert result is None
+def test_constant_value_invalid():
+    """Test that predicates other than column = constant return None"""
+    assert _constant("t1.value > 10") is None
+    assert _constant("t2.value <= 100") is None
+    assert _constant("t3.name LIKE 'abc%'") is None
+    assert _constant("t4.col IS NULL") is None
     
-    # Less than
-    result = _extract_single_constant_value("t2.value <= 100")
-    assert result is None
+    # Disjunctions and column comparisons are not constants
+    assert _constant("t.x = 1 OR t.y = 2") is None
+    assert _constant("t1.x = 'a' OR t1.x = 'b'") is None
+    assert _constant("t.x = t.y") is None
+    assert _constant("t.x = lower(t.y)") is None
+
+
+def test_constant_equality_without_expressions():
+    """Test predicates added without an expression are parsed, not scanned"""
+    from parser import _detect_constant_equality_joins
     
-    # LIKE
-    result = _extract_single_constant_value("t3.name LIKE 'abc%'")
-    assert result is None
+    classifier = PredicateClassifier()
+    classifier.add_predicate("t1.x = 1 OR t1.y = 2", {'t1'})
+    classifier.add_predicate("t2.x = 1", {'t2'})
+    classifier.add_predicate("t1.z = t1.w", {'t1'})
+    classifier.add_predicate("t2.z = t2.w", {'t2'})
     
-    # IS NULL
-    result = _extract_single_constant_value("t4.col IS NULL")
-    assert result is None
+    assert _detect_constant_equality_joins(classifier, ['t1', 't2']) == []
     
-    print("✓ Extract rejects non-equality predicates")
+    # Same result as with the parsed expressions attached
+    with_exprs = PredicateClassifier()
+    for pred, tables in ((p, classifier.predicate_tables[p]) for p in classifier.all_predicates):
+        with_exprs.add_predicate(pred, tables, parse_one(pred))
+    assert _detect_constant_equality_joins(with_exprs, ['t1', 't2']) == []
 
 
 def test_constant_equality_detection_scenario():
@@ -119,7 +111,6 @@ def test_constant_equality_detection_scenario():
     classifier.add_predicate("t1.status = 'active'", {'t1'})
     classifier.add_predicate("t2.status = 'active'", {'t2'})
     classifier.add_predicate("t1.value > 10", {'t1'})  # Non-constant
-    classifier.classify_predicates()
     
     # Detect constant joins
     tables = ['t1', 't2']
@@ -129,8 +120,6 @@ def test_constant_equality_detection_scenario():
     assert len(const_joins) == 1
     assert const_joins[0].column == 'status'
     assert {const_joins[0].t1, const_joins[0].t2} == {'t1', 't2'}
-    
-    print("✓ Constant equality detection works")
 
 
 def test_constant_equality_no_match():
@@ -144,15 +133,12 @@ def test_constant_equality_no_match():
     classifier = PredicateClassifier()
     classifier.add_predicate("t1.status = 'active'", {'t1'})
     classifier.add_predicate("t2.status = 'pending'", {'t2'})
-    classifier.classify_predicates()
     
     tables = ['t1', 't2']
     const_joins = _detect_constant_equality_joins(classifier, tables)
     
     # Should find no joins (different constants)
     assert len(const_joins) == 0
-    
-    print("✓ Different constants correctly rejected")
 
 
 def test_constant_equality_three_tables():
@@ -160,43 +146,95 @@ def test_constant_equality_three_tables():
     Test constant equality with three tables
     
     t1.col = 'X' AND t2.col = 'X' AND t3.col = 'X'
-    Should create 3 joins: t1-t2, t1-t3, t2-t3
+    Should create 2 joins anchored on t1: t1-t2, t1-t3
+    (t2-t3 follows from transitive closure)
     """
-    from parser import _detect_constant_equality_joins
+    from parser import _detect_constant_equality_joins, parse_sql
     
     classifier = PredicateClassifier()
     classifier.add_predicate("t1.col = 'X'", {'t1'})
     classifier.add_predicate("t2.col = 'X'", {'t2'})
     classifier.add_predicate("t3.col = 'X'", {'t3'})
-    classifier.classify_predicates()
     
     tables = ['t1', 't2', 't3']
     const_joins = _detect_constant_equality_joins(classifier, tables)
     
-    # Should find 3 joins (all pairs)
-    assert len(const_joins) == 3
+    # Should find 2 joins (star on the first table)
+    assert len(const_joins) == 2
+    assert {(j.t1, j.t2) for j in const_joins} == {('t1', 't2'), ('t1', 't3')}
+    
+    # Full pipeline still links every pair
+    parsed = parse_sql(
+        "SELECT * FROM a t1, a t2, a t3 "
+        "WHERE t1.col = 'X' AND t2.col = 'X' AND t3.col = 'X'"
+    )
+    jg = parsed.join_graph
+    assert jg.edges == {
+        frozenset(('t1', 't2')), frozenset(('t1', 't3')), frozenset(('t2', 't3'))
+    }
+    assert len(jg.equivalence_classes) == 1
+
+
+def test_constant_equality_wide_fanout():
+    """Test that a constant shared by many tables yields one join per extra table"""
+    from parser import _detect_constant_equality_joins
+    
+    tables = [f't{i}' for i in range(1, 25)]
+    classifier = PredicateClassifier()
+    for table in tables:
+        classifier.add_predicate(f"{table}.kind = 'movie'", {table})
+    
+    const_joins = _detect_constant_equality_joins(classifier, tables)
+    
+    # Linear in the group size, not C(24, 2) = 276
+    assert len(const_joins) == 23
+    assert all(j.t1 == 't1' and j.column == 'kind' for j in const_joins)
+    assert [j.t2 for j in const_joins] == tables[1:]
+
+
+def test_split_where_conditions_order():
+    """Test AND chains are split into conjuncts in query order"""
+    ast = parse_one(
+        "SELECT * FROM a, b WHERE a.x = b.x AND a.y = 1 AND b.z > 2 AND a.w = 'k'"
+    )
+    conditions = _split_where_conditions(ast.args['where'].this)
+    
+    assert [c.sql() for c in conditions] == [
+        'a.x = b.x', 'a.y = 1', 'b.z > 2', "a.w = 'k'"
+    ]
+
+
+def test_predicates_for_subset_cached():
+    """Test subset lookups are memoised and invalidated on new predicates"""
+    classifier = PredicateClassifier()
+    classifier.add_predicate("t1.a = 1", {'t1'})
+    classifier.add_predicate("t1.b = t2.b", {'t1', 't2'})
+    
+    # Classified on insertion
+    assert classifier.selections == ["t1.a = 1"]
+    assert classifier.joins == ["t1.b = t2.b"]
+    
+    preds = classifier.get_predicates_for_subset(['t1', 't2'])
+    assert preds.selections == ("t1.a = 1",)
+    assert preds.joins == ("t1.b = t2.b",)
     
-    # Check all pairs exist
-    pairs = {(j.t1, j.t2) for j in const_joins}
-    pairs |= {(j.t2, j.t1) for j in const_joins}  # Add reverse pairs
+    # Same set of tables in a different order hits the cache
+    assert classifier.get_predicates_for_subset(('t2', 't1')) is preds
     
-    assert ('t1', 't2') in pairs or ('t2', 't1') in pairs
-    assert ('t1', 't3') in pairs or ('t3', 't1') in pairs
-    assert ('t2', 't3') in pairs or ('t3', 't2') in pairs
+    # Adding a predicate invalidates cached results
+    classifier.add_predicate("t2.c = 2", {'t2'})
+    preds = classifier.get_predicates_for_subset(['t1', 't2'])
+    assert preds.selections == ("t1.a = 1", "t2.c = 2")
+
+
+def test_predicate_tables_interned():
+    """Test predicate table names are the interned alias objects"""
+    condition = parse_one("SELECT * FROM orders ord WHERE ord.total > 5").args['where'].this
+    ((_, tables, _),) = _extract_predicates_from_where([condition])
     
-    print("✓ Three-table constant equality works")
+    (table,) = tables
+    assert table is sys.intern(''.join(['or', 'd']))
 
 
 if __name__ == '__main__':
-    print("\nTesting parser helper functions...\n")
-    
-    test_normalize_value()
-    test_extract_single_constant_value_equality()
-    test_extract_single_constant_value_in_single()
-    test_extract_single_constant_value_in_multiple()
-    test_extract_single_constant_value_invalid()
-    test_constant_equality_detection_scenario()
-    test_constant_equality_no_match()
-    test_constant_equality_three_tables()
-    
-    print("\n✅ All parser tests passed!\n")
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,167 @@
+"""
+Test utility functions
+
+Tests query extraction from raw text and subset formatting
+"""
+
+import sys
+
+import pytest
+
+from constants import BitmaskSubset
+from utils import (
+    canonical_tuple,
+    extract_select_query,
+    extract_queries_line_by_line,
+    extract_queries_semicolon_separated,
+    format_subset,
+    generate_canonical_key,
+    generate_canonical_key_bits
+)
+
+
+def test_extract_select_query():
+    """Test extracting one query from a line"""
+    assert extract_select_query("SELECT * FROM a;") == "SELECT * FROM a;"
+    
+    # Text before SELECT is ignored, a missing semicolon is added
+    assert extract_select_query("-- q1: select * from a") == "select * from a;"
+    
+    # Only the first statement is kept
+    assert extract_select_query("SELECT 1; SELECT 2;") == "SELECT 1;"
+    
+    # Line breaks do not end a query
+    assert extract_select_query("SELECT a\nFROM b  \n") == "SELECT a\nFROM b;"
+    
+    # SELECT is matched in any case
+    assert extract_select_query("sElEcT 1") == "sElEcT 1;"
+    
+    assert extract_select_query("no query here") is None
+    assert extract_select_query("SELECT") is None
+
+
+def test_extract_queries_line_by_line():
+    """Test one query per line, with 1-based line numbers"""
+    content = "SELECT * FROM a;\n\n# comment\nq: SELECT * FROM b WHERE b.x = 1\n"
+    
+    assert extract_queries_line_by_line(content) == [
+        (1, "SELECT * FROM a;"),
+        (4, "SELECT * FROM b WHERE b.x = 1;"),
+    ]
+
+
+def test_read_queries_streams_blocks(tmp_path, monkeypatch):
+    """Test line-by-line reading gives the same result at any block size"""
+    import utils
+    
+    content = "SELECT 1;\r\nx\nq: select 2\n\nSELECT 3; SELECT 4;\nSELECT 5"
+    path = tmp_path / "queries.sql"
+    path.write_bytes(content.encode())
+    
+    expected = [(1, "SELECT 1;"), (3, "select 2;"), (5, "SELECT 3;"), (6, "SELECT 5;")]
+    for block_size in (1, 4, 1 << 20):
+        monkeypatch.setattr(utils, 'READ_BLOCK_SIZE', block_size)
+        assert utils.read_queries_from_file(str(path)) == expected
+    
+    # Lone \r breaks lines, as in text mode; non-ASCII text is kept
+    content = "-- é\rselect\u3000é FROM a\r\rSELECT b 🙂; x\n"
+    path.write_bytes(content.encode('utf-8'))
+    
+    expected = [(2, "select\u3000é FROM a;"), (4, "SELECT b 🙂;")]
+    for block_size in (1, 3, 1 << 20):
+        monkeypatch.setattr(utils, 'READ_BLOCK_SIZE', block_size)
+        assert utils.read_queries_from_file(str(path)) == expected
+
+
+def test_extract_queries_semicolon_separated():
+    """Test multi-line queries numbered by the line they start on"""
+    content = "SELECT *\nFROM a\nWHERE a.x = 1;\n\nselect * from b;\nSELECT unterminated"
+    
+    assert extract_queries_semicolon_separated(content) == [
+        (1, "SELECT *\nFROM a\nWHERE a.x = 1;"),
+        (5, "select * from b;"),
+    ]
+
+
+def test_extract_queries_line_numbers_many_queries():
+    """Test line numbers stay exact over many queries"""
+    count = 50000
+    content = "".join(f"-- q{i}\nSELECT {i};\n" for i in range(count))
+    expected = [(2 * i + 2, f"SELECT {i};") for i in range(count)]
+    
+    assert extract_queries_line_by_line(content) == expected
+    assert extract_queries_semicolon_separated(content) == expected
+
+
+def test_extract_queries_semicolon_separated_unterminated():
+    """Test SELECTs without a semicolon do not backtrack quadratically"""
+    content = "SELECT" + " " * 100000 + "x"
+    assert extract_queries_semicolon_separated(content) == []
+    
+    content = "SELECT a;" + "SELECT b " * 20000
+    assert extract_queries_semicolon_separated(content) == [(1, "SELECT a;")]
+
+
+def test_read_queries_semicolon_separated(tmp_path):
+    """Test semicolon-separated files read in text mode, CRLF included"""
+    import utils
+    
+    content = "SELECT *\r\nFROM a;\r\n\rselect　* FROM b;\nSELECT\xa0x FROM c;\nSELECT tail"
+    path = tmp_path / "queries.sql"
+    path.write_bytes(content.encode('utf-8'))
+    
+    expected = [(1, "SELECT *\nFROM a;"), (4, "select　* FROM b;"), (5, "SELECT\xa0x FROM c;")]
+    assert utils.read_queries_from_file(str(path), semicolon_separated=True) == expected
+    
+    path.write_bytes(b"")
+    assert utils.read_queries_from_file(str(path), semicolon_separated=True) == []
+
+
+def test_format_subset():
+    """Test subsets are formatted sorted, whatever their input order"""
+    assert format_subset(('a',)) == "{a}"
+    assert format_subset({'c', 'a', 'b'}) == "{a, b, c}"
+    assert format_subset(('t2', 't10', 't1')) == "{t1, t10, t2}"
+    
+    # Cached per set of tables: any input order gives the same string
+    assert format_subset(['b', 'a']) is format_subset(('a', 'b'))
+
+
+def test_generate_canonical_key():
+    """Test canonical keys do not depend on input order"""
+    assert generate_canonical_key({'b', 'a'}) == generate_canonical_key({'a', 'b'})
+    assert generate_canonical_key({'a', 'b'}) != generate_canonical_key({'a', 'c'})
+
+
+def test_bitmask_subset_formatting():
+    """Test BitmaskSubsets format like the set of their aliases"""
+    tables = ['a', 'b', 'c', 'd']
+    table_bits = {t: 1 << i for i, t in enumerate(tables)}
+    subset = BitmaskSubset(0b1101, tables, table_bits)
+    
+    assert format_subset(subset) == format_subset({'d', 'c', 'a'}) == "{a, c, d}"
+    assert generate_canonical_key(subset) == generate_canonical_key({'d', 'c', 'a'})
+    assert canonical_tuple(subset) == canonical_tuple({'d', 'c', 'a'}) == ('a', 'c', 'd')
+
+
+def test_canonical_tuple():
+    """Test tuple keys are sorted and do not depend on input order"""
+    assert canonical_tuple({'b', 'a'}) == ('a', 'b')
+    assert canonical_tuple(['b', 'a']) == canonical_tuple(('a', 'b'))
+    assert canonical_tuple(()) == ()
+
+
+def test_generate_canonical_key_bits():
+    """Test bitmask keys OR the tables' bits"""
+    table_bits = {'a': 1, 'b': 2, 'c': 4}
+    
+    assert generate_canonical_key_bits(('c', 'a'), table_bits) == 0b101
+    assert generate_canonical_key_bits({'a', 'c'}, table_bits) == 0b101
+    assert generate_canonical_key_bits((), table_bits) == 0
+    
+    with pytest.raises(KeyError):
+        generate_canonical_key_bits({'z'}, table_bits)
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
@@ -5,7 +5,34 @@ Includes query extraction, formatting helpers, and file I/O
 """
 
 import re
-from typing import List, Tuple, Set, Optional
+from functools import lru_cache
+from operator import attrgetter
+from typing import List, Tuple, Set, Optional, Iterable, Mapping, FrozenSet, TextIO
+from constants import BitmaskSubset, JoinPredicate
+
+
+# Case-insensitive SELECT, shared by the query patterns
+_SELECT = r'(?i:SELECT)'
+
+# SELECT up to the next semicolon (queries may span lines). A single \s
+# followed by [^;]* leaves no two quantifiers competing for the same
+# characters, so a failed attempt scans ahead once instead of backtracking
+# over every split of the whitespace run. This needs no possessive
+# quantifier, which re only has from Python 3.11 (the README requires 3.10+)
+_SELECT_SEMI_RE = re.compile(rf'({_SELECT}\s[^;]*);')
+
+# Start of a query: SELECT followed by whitespace
+_SELECT_START_RE = re.compile(rf'{_SELECT}\s')
+
+# SELECT up to the next semicolon or line break; the rest of the line is
+# consumed so that only the first query of each line matches
+_SELECT_LINE_RE = re.compile(rf'({_SELECT}[^\S\n]+[^;\n]*)[^\n]*')
+
+# Entries kept by the subset formatting caches
+SUBSET_CACHE_SIZE = 1 << 16
+
+# Characters read per block when streaming one-query-per-line files
+READ_BLOCK_SIZE = 1 << 20
 
 
 def read_queries_from_file(filepath: str, semicolon_separated: bool = False) -> List[Tuple[int, str]]:
@@ -20,33 +47,86 @@ def read_queries_from_file(filepath: str, semicolon_separated: bool = False) ->
     Returns:
         List of (line_number, query_text) tuples
     """
+    if semicolon_separated:
+        with open(filepath, 'r') as f:
+            return extract_queries_semicolon_separated(f.read())
+    
     with open(filepath, 'r') as f:
-        content = f.read()
+        return _stream_queries_line_by_line(f)
+
+
+def _stream_queries_line_by_line(f: TextIO) -> List[Tuple[int, str]]:
+    """
+    Extract one-per-line queries from an open file, block by block
     
-    if semicolon_separated:
-        return extract_queries_semicolon_separated(content)
-    else:
-        return extract_queries_line_by_line(content)
+    Only READ_BLOCK_SIZE characters plus one partial line are held at a
+    time. Each block is cut after its last newline and scanned with
+    extract_queries_line_by_line; the partial line is carried over.
+    
+    A partial line is kept as a list of pieces and joined once its newline
+    arrives, so a line spanning many blocks is copied once rather than on
+    every block.
+    
+    Args:
+        f: File opened in text mode
+    
+    Returns:
+        List of (line_number, query_text) tuples
+    """
+    queries = []
+    first_line = 1
+    pending = []  # Pieces of the current partial line
+    
+    while True:
+        block = f.read(READ_BLOCK_SIZE)
+        if not block:
+            break
+        
+        cut = block.rfind('\n') + 1
+        if not cut:
+            pending.append(block)
+            continue
+        
+        pending.append(block[:cut])
+        lines = ''.join(pending)
+        pending = [block[cut:]]
+        
+        queries.extend(extract_queries_line_by_line(lines, first_line))
+        first_line += lines.count('\n')
+    
+    # Last line without a trailing newline
+    carry = ''.join(pending)
+    if carry:
+        queries.extend(extract_queries_line_by_line(carry, first_line))
+    
+    return queries
 
 
-def extract_queries_line_by_line(content: str) -> List[Tuple[int, str]]:
+def extract_queries_line_by_line(content: str, first_line: int = 1) -> List[Tuple[int, str]]:
     """
     Extract queries from file (one per line)
     Only extracts text between SELECT and semicolon/linebreak
     
+    Same result as extract_select_query on every line, found in a single
+    pass over the content instead of splitting it into lines.
+    
     Args:
         content: File content
+        first_line: Line number of the content's first line
     
     Returns:
         List of (line_number, query_text) tuples
     """
     queries = []
-    lines = content.split('\n')
+    line_num = first_line
+    pos = 0
     
-    for line_num, line in enumerate(lines, 1):
-        query = extract_select_query(line)
-        if query:
-            queries.append((line_num, query))
+    for match in _SELECT_LINE_RE.finditer(content):
+        # Matches come in order, so count only the newlines since the last one
+        line_num += content.count('\n', pos, match.start())
+        pos = match.start()
+        
+        queries.append((line_num, match.group(1).strip() + ';'))
     
     return queries
 
@@ -63,16 +143,21 @@ def extract_queries_semicolon_separated(content: str) -> List[Tuple[int, str]]:
         List of (line_number, query_text) tuples
     """
     queries = []
+    line_num = 1
+    pos = 0
     
-    # Find all SELECT...semicolon patterns
-    pattern = r'(?i)(SELECT\s+.*?)(?:;)'
-    matches = re.finditer(pattern, content, re.DOTALL)
+    # Find all SELECT...semicolon patterns. No query can end after the last
+    # semicolon; stopping there keeps SELECTs without one from each scanning
+    # to the end of the content
+    matches = _SELECT_SEMI_RE.finditer(content, 0, content.rfind(';') + 1)
     
     for match in matches:
         query = match.group(1).strip() + ';'
         
-        # Calculate line number (count newlines before match)
-        line_num = content[:match.start()].count('\n') + 1
+        # Calculate line number: matches come in order, so only the newlines
+        # since the previous match are counted, without slicing the prefix
+        line_num += content.count('\n', pos, match.start())
+        pos = match.start()
         
         queries.append((line_num, query))
     
@@ -82,53 +167,149 @@ def extract_queries_semicolon_separated(content: str) -> List[Tuple[int, str]]:
 def extract_select_query(text: str) -> Optional[str]:
     """
     Extract SELECT query from text
-    Finds text between SELECT and semicolon/linebreak
-    Ignores any text before SELECT
+    Finds text from SELECT up to the first semicolon or the end of the text,
+    line breaks included; any text before SELECT is ignored
     
     Args:
         text: Raw text that may contain a query
     
     Returns:
-        Extracted query or None if no SELECT found
+        Extracted query ending in exactly one semicolon, or None if no
+        SELECT found
     """
-    # Find SELECT...semicolon or SELECT...end-of-string
-    # Case-insensitive, captures SELECT to end
-    pattern = r'(?i)(SELECT\s+.*?)(?:;|\Z)'
-    match = re.search(pattern, text, re.DOTALL)
+    # Locate SELECT (case-insensitive); text without one needs no further work
+    match = _SELECT_START_RE.search(text)
+    if match is None:
+        return None
     
-    if match:
-        query = match.group(1).strip()
-        # Add semicolon back if it was in original
-        if match.end() < len(text) and text[match.end()-1] == ';':
-            query += ';'
-        elif not query.endswith(';'):
-            query += ';'
-        return query
+    # Query runs to the next semicolon or the end of the text
+    start = match.start()
+    end = text.find(';', start)
+    if end == -1:
+        end = len(text)
     
-    return None
+    # The slice starts at SELECT, so only trailing whitespace remains; the
+    # semicolon, if any, lies outside it and is added back exactly once
+    return text[start:end].rstrip() + ';'
 
 
-def format_subset(subset: Set[str]) -> str:
+def format_subset(subset: Iterable[str]) -> str:
     """
     Format subset as {t1, t2, t3}
     
+    A BitmaskSubset already yields its aliases in sorted order and is
+    joined directly. Other inputs are memoised per set of tables, so a
+    subset seen before (e.g. in a repeated query) skips the sort and join.
+    
     Args:
-        subset: Set of table aliases
+        subset: Table aliases (BitmaskSubset, set or sorted tuple)
     
     Returns:
         Formatted string
     """
-    return '{' + ', '.join(sorted(subset)) + '}'
+    if type(subset) is BitmaskSubset:
+        # One f-string instead of two concatenations; {{ and }} are literal braces
+        return f'{{{", ".join(subset.names)}}}'
+    return _format_subset_cached(frozenset(subset))
+
+
+@lru_cache(maxsize=SUBSET_CACHE_SIZE)
+def _format_subset_cached(subset: FrozenSet[str]) -> str:
+    """Format a frozenset of aliases; see format_subset"""
+    return f'{{{", ".join(sorted(subset))}}}'
+
+
+def order_join_predicates(predicates: Iterable[JoinPredicate]) -> List[JoinPredicate]:
+    """
+    Order join predicates with original joins first, then by predicate text
+    
+    Partitions on is_original and sorts each part by text, which avoids
+    building a tuple key per predicate.
+    
+    Args:
+        predicates: Join predicates in any order
+    
+    Returns:
+        New list: original predicates, then transitive ones, each sorted
+    """
+    originals = []
+    transitives = []
+    for pred in predicates:
+        (originals if pred.is_original else transitives).append(pred)
+    
+    by_text = attrgetter('predicate')
+    originals.sort(key=by_text)
+    transitives.sort(key=by_text)
+    
+    return originals + transitives
 
 
 def generate_canonical_key(subset: Set[str]) -> str:
     """
     Generate sorted, canonical key for subset
     
+    Meant for display; dedup and memoisation should key on
+    generate_canonical_key_bits, which sorts and allocates nothing, or on
+    canonical_tuple where no table-to-bit mapping is at hand.
+    A BitmaskSubset is joined directly, its aliases being sorted already;
+    other results are memoised per set of tables.
+    
     Args:
-        subset: Set of table aliases
+        subset: Set of table aliases, or a BitmaskSubset
     
     Returns:
         Canonical key: "t1|||t2|||t3"
     """
+    if type(subset) is BitmaskSubset:
+        return '|||'.join(subset.names)
+    return _canonical_key_cached(frozenset(subset))
+
+
+@lru_cache(maxsize=SUBSET_CACHE_SIZE)
+def _canonical_key_cached(subset: FrozenSet[str]) -> str:
+    """Build the canonical key of a frozenset of aliases; see generate_canonical_key"""
     return '|||'.join(sorted(subset))
+
+
+def canonical_tuple(subset: Iterable[str]) -> Tuple[str, ...]:
+    """
+    Generate sorted alias tuple for subset, for use as a dict or set key
+    
+    Hashing a tuple combines the aliases' cached string hashes, where the
+    joined string of generate_canonical_key is built and hashed anew.
+    A BitmaskSubset returns its names tuple, which is already sorted and
+    built at most once.
+    
+    Args:
+        subset: Table aliases
+    
+    Returns:
+        Sorted tuple of aliases
+    """
+    if type(subset) is BitmaskSubset:
+        return subset.names
+    return tuple(sorted(subset))
+
+
+def generate_canonical_key_bits(subset: Iterable[str], table_bits: Mapping[str, int]) -> int:
+    """
+    Generate canonical bitmask key for subset
+    
+    The key is the OR of the tables' bits, so it does not depend on order.
+    table_bits is the per-query mapping (e.g. PostgreSQLJoinEnumerator.table_bits);
+    keys built from different mappings are not comparable.
+    
+    Args:
+        subset: Table aliases
+        table_bits: table -> 1 << index
+    
+    Returns:
+        Subset bitmask
+    
+    Raises:
+        KeyError: If a table has no bit in table_bits
+    """
+    key = 0
+    for table in subset:
+        key |= table_bits[table]
+    return key